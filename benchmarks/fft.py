@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Compares the FFT backends computing the band power of every channel of a
+window, which is the spectral work done by the plots in each tick. The
+reference transforms the channels one by one and integrates each band with the
+trapezoidal rule, creating the window function and the bounds of the bands
+every time, as eeglib does.
+
+    $ python benchmarks/fft.py --channels 64 256 --windows 256 512 1024 2048
+"""
+
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+from scipy import integrate, signal
+
+from eeglib.eeg import defaultBands
+
+#The benchmarks can be run from the root of the repository without
+#installing VEEGS
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), os.pardir))
+
+from veegs import spectra
+
+
+def perChannel(window, sampleRate):
+    windowSize = window.shape[1]
+    values = []
+    for channel in window:
+        magnitudes = np.abs(np.fft.fft(channel *
+                            signal.get_window("hann", windowSize)))
+        magnitudes = magnitudes[:windowSize//2 + 1]
+        bounds = [(int(low * windowSize / sampleRate),
+                   int(high * windowSize / sampleRate))
+                  for low, high in defaultBands.values()]
+        values.append([integrate.trapezoid(magnitudes[start:stop],
+                                           dx=sampleRate/windowSize)
+                       for start, stop in bounds])
+    return np.array(values)
+
+
+def batched(window, sampleRate):
+    return spectra.bandPower(spectra.magnitudes(window), window.shape[1],
+                             sampleRate)
+
+
+def measure(function, repeats):
+    best = np.inf
+    for _ in range(repeats):
+        t0 = time.perf_counter()
+        function()
+        best = min(best, time.perf_counter() - t0)
+    return best * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__,
+                            formatter_class=argparse.RawTextHelpFormatter)
+    parser.add_argument("--channels", type=int, nargs="+", default=[64, 256])
+    parser.add_argument("--windows", type=int, nargs="+",
+                        default=[256, 512, 1024, 2048],
+                        help="Window sizes in samples.")
+    parser.add_argument("--sample-rate", type=float, default=256)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1,
+                        help="Threads of the scipy backend.")
+    parser.add_argument("--repeats", type=int, default=20)
+    parser.add_argument("--tolerance", type=float, default=1e-9)
+    args = parser.parse_args()
+
+    backends = [("numpy", None), ("scipy", 1)]
+    if args.workers > 1:
+        backends.append(("scipy", args.workers))
+
+    rng = np.random.default_rng(0)
+    failed = False
+    header = "".join("%14s" % ("%s/%d" % (name, workers or 1))
+                     for name, workers in backends)
+    print("%8s %7s %12s%s %10s" % ("channels", "window", "per channel",
+                                   header, "max error"))
+    for nChannels in args.channels:
+        for windowSize in args.windows:
+            window = rng.standard_normal((nChannels, windowSize))
+            expected = perChannel(window, args.sample_rate)
+            tReference = measure(lambda: perChannel(window, args.sample_rate),
+                                 args.repeats)
+
+            times = []
+            error = 0
+            for name, workers in backends:
+                spectra.setBackend(name, workers)
+                error = max(error, np.max(np.abs(
+                                  batched(window, args.sample_rate) - expected)))
+                times.append(measure(lambda: batched(window, args.sample_rate),
+                                     args.repeats))
+            failed |= not error <= args.tolerance
+
+            print("%8d %7d %10.2fms%s %10.1e" %
+                  (nChannels, windowSize, tReference,
+                   "".join("%12.2fms" % t for t in times), error))
+
+    if failed:
+        raise SystemExit("The backends don't match the reference.")
+
+if __name__ == '__main__':
+    main()
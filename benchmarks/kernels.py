@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Checks that the compiled kernels give the same values as eeglib and compares
+the time needed to compute each feature over all the channels of a window.
+
+    $ python benchmarks/kernels.py --channels 32 --windows 128 256 512 1024
+"""
+
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+from eeglib import features
+
+#The benchmarks can be run from the root of the repository without
+#installing VEEGS
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), os.pardir))
+
+from veegs import kernels
+
+#Kernel and eeglib function of each feature
+pairs = {"PFD"   : (kernels.PFD,    features.PFD),
+         "HFD"   : (kernels.HFD,    features.HFD),
+         "LZC"   : (kernels.LZC,    kernels._eeglibLZC),
+         "DFA"   : (kernels.DFA,    features.DFA),
+         "sampEn": (kernels.sampEn, features.sampEn)}
+
+
+def perChannel(function, window):
+    return np.array([function(channel) for channel in window])
+
+
+def measure(function, repeats):
+    best = np.inf
+    for _ in range(repeats):
+        t0 = time.perf_counter()
+        function()
+        best = min(best, time.perf_counter() - t0)
+    return best * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__,
+                            formatter_class=argparse.RawTextHelpFormatter)
+    parser.add_argument("--channels", type=int, default=32)
+    parser.add_argument("--windows", type=int, nargs="+",
+                        default=[128, 256, 512, 1024],
+                        help="Window sizes in samples.")
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--tolerance", type=float, default=1e-9)
+    args = parser.parse_args()
+
+    print("Kernels compiled: %s" % kernels.available)
+    t0 = time.perf_counter()
+    kernels.warmUp()
+    print("Warm up: %.2fs" % (time.perf_counter() - t0))
+
+    rng = np.random.default_rng(0)
+    failed = False
+    print("%-8s %7s %12s %12s %9s %10s" % ("feature", "window", "eeglib",
+                                         "kernel", "speedup", "max error"))
+    for windowSize in args.windows:
+        #A random walk with noise, closer to an EEG than white noise
+        window = (rng.standard_normal((args.channels, windowSize)) +
+                  rng.standard_normal((args.channels, windowSize)).cumsum(1))
+
+        for name, (kernel, reference) in pairs.items():
+            expected = perChannel(reference, window)
+            error = np.max(np.abs(kernel(window) - expected))
+            failed |= not error <= args.tolerance
+
+            tReference = measure(lambda: perChannel(reference, window),
+                                 args.repeats)
+            tKernel = measure(lambda: kernel(window), args.repeats)
+            print("%-8s %7d %10.2fms %10.2fms %8.1fx %10.1e" %
+                  (name, windowSize, tReference, tKernel,
+                   tReference/tKernel, error))
+
+    if failed:
+        raise SystemExit("The kernels don't match eeglib.")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Compares the memory and the throughput of the data pipeline when the samples
+are stored as float64 and as float32. A synthetic EDF file is written and
+loaded with the same loader used by the GUI, and its windows go through the
+same slicing, spectra and features computed by the plots.
+
+The peak memory is the highest memory allocated while loading, measured with
+tracemalloc, which also tracks the numpy arrays.
+
+    $ python benchmarks/precision.py --channels 256 --seconds 600
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+from pyedflib import highlevel
+
+#The benchmarks can be run from the root of the repository without
+#installing VEEGS
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), os.pardir))
+
+import eeglib.features as features
+
+from veegs.loadDialog import FileLoader
+from veegs import kernels
+from veegs import spectra
+
+
+def writeFile(path, nChannels, seconds, sampleRate):
+    rng = np.random.default_rng(0)
+    nSamples = int(seconds * sampleRate)
+    signals = rng.standard_normal((nChannels, nSamples)) * 50
+    headers = highlevel.make_signal_headers(
+                    ["C%d" % i for i in range(nChannels)],
+                    sample_frequency=sampleRate,
+                    physical_min=-500, physical_max=500)
+    highlevel.write_edf(path, signals, headers)
+
+
+def load(path, dtype):
+    """
+    Loads the file as the GUI does and returns the helper and the peak
+    memory in bytes.
+    """
+    helpers = []
+    loader = FileLoader(path, dtype=dtype)
+    loader.sigFinished.connect(helpers.append)
+    loader.sigFailed.connect(lambda e: print(e, file=sys.stderr))
+
+    tracemalloc.start()
+    loader.run()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return helpers[0], peak
+
+
+def windows(helper, step):
+    helper.prepareIterator(step=step)
+    for eeg in helper:
+        yield eeg.window.window
+
+
+def slicing(helper, step):
+    for window in windows(helper, step):
+        np.ascontiguousarray(window)
+
+
+def spectralValues(helper, step):
+    """
+    The average band values of all the channels, as the band values canvas
+    does.
+    """
+    for window in windows(helper, step):
+        spectra.averageBandValues(spectra.magnitudes(window), window.shape[1],
+                                  helper.sampleRate)
+
+
+def channelFeatures(helper, step):
+    """
+    PFD and the Hjorth activity, which accumulates in float64.
+    """
+    for window in windows(helper, step):
+        for channel in window:
+            kernels.PFD(channel)
+            features.hjorthActivity(channel)
+
+
+def measure(function, helper, step, repeats):
+    nWindows = len(range(0, len(helper) - helper.windowSize + 1, step))
+    best = np.inf
+    for _ in range(repeats):
+        t0 = time.perf_counter()
+        function(helper, step)
+        best = min(best, time.perf_counter() - t0)
+    return nWindows / best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__,
+                            formatter_class=argparse.RawTextHelpFormatter)
+    parser.add_argument("--channels", type=int, default=256)
+    parser.add_argument("--seconds", type=float, default=600)
+    parser.add_argument("--sample-rate", type=int, default=256)
+    parser.add_argument("--step", type=float, default=0.125,
+                        help="Step in seconds.")
+    parser.add_argument("--repeats", type=int, default=3)
+    args = parser.parse_args()
+
+    step = int(args.step * args.sample_rate)
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "recording.edf")
+        writeFile(path, args.channels, args.seconds, args.sample_rate)
+        kernels.warmUp()
+
+        helper64, peak64 = load(path, np.float64)
+        data64 = helper64.data.nbytes
+        helper32, peak32 = load(path, np.float32)
+        data32 = helper32.data.nbytes
+
+    print("%d channels, %d samples, window %d, step %d" %
+          (args.channels, len(helper64), helper64.windowSize, step))
+    print("%-10s %12s %12s %8s" % ("", "float64", "float32", "ratio"))
+    print("%-10s %10.1fMB %10.1fMB %8.2f" % ("data", data64/2**20,
+                                             data32/2**20, data64/data32))
+    print("%-10s %10.1fMB %10.1fMB %8.2f" % ("peak load", peak64/2**20,
+                                             peak32/2**20, peak64/peak32))
+
+    for name, function in (("slicing", slicing), ("spectra", spectralValues),
+                           ("features", channelFeatures)):
+        r64 = measure(function, helper64, step, args.repeats)
+        r32 = measure(function, helper32, step, args.repeats)
+        print("%-10s %10.0f/s %10.0f/s %8.2f" % (name, r64, r32, r32/r64))
+
+if __name__ == '__main__':
+    main()
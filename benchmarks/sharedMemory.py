@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Compares the cost per tick of sending windows to worker processes by pickling
+them and by sending only their position in the shared recording.
+
+    $ python benchmarks/sharedMemory.py --workers 4
+"""
+
+import argparse
+import os
+import sys
+import time
+
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+#The benchmarks can be run from the root of the repository without
+#installing VEEGS
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), os.pardir))
+
+from veegs.sharedData import SharedWorkerPool
+
+
+def _applyToChannels(function, window):
+    return np.array([function(signal) for signal in window])
+
+
+def pickled(pool, data, function, offset, length, nJobs):
+    futures = [pool.submit(_applyToChannels, function,
+                           data[:, offset:offset + length])
+               for _ in range(nJobs)]
+    return [future.result() for future in futures]
+
+
+def shared(pool, data, function, offset, length, nJobs):
+    channels = range(len(data))
+    return pool.map([(function, offset, length, channels)] * nJobs)
+
+
+def measure(method, pool, data, length, nJobs, ticks):
+    step = max(1, (data.shape[1] - length) // ticks)
+    t0 = time.perf_counter()
+    for tick in range(ticks):
+        method(pool, data, len, tick*step, length, nJobs)
+    return (time.perf_counter() - t0) / ticks * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__,
+                            formatter_class=argparse.RawTextHelpFormatter)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--jobs", type=int, default=4,
+                        help="Jobs per tick, one per feature.")
+    parser.add_argument("--ticks", type=int, default=50)
+    parser.add_argument("--samples", type=int, default=2**18)
+    args = parser.parse_args()
+
+    #The function is len, so the time measured is the communication
+    print("%8s %8s %12s %12s" % ("channels", "window", "pickled(ms)",
+                                 "shared(ms)"))
+    for nChannels in (64, 256):
+        data = np.random.default_rng(0).standard_normal((nChannels,
+                                                         args.samples))
+        sharedPool = SharedWorkerPool(data, args.workers)
+        with ProcessPoolExecutor(args.workers) as pickledPool:
+            for length in (256, 1024, 4096, 16384):
+                tp = measure(pickled, pickledPool, data, length, args.jobs,
+                             args.ticks)
+                ts = measure(shared, sharedPool, data, length, args.jobs,
+                             args.ticks)
+                print("%8d %8d %12.3f %12.3f" % (nChannels, length, tp, ts))
+        sharedPool.close()
+
+if __name__ == '__main__':
+    main()
@@ -11,7 +11,8 @@ setup(name='veegs',
       author='Luis Cabañero Gómez',
       author_email='luiscabanerogomezxcr@hotmail.com',
 #      url='',
-      scripts=['veegs/bin/VEEGS'],
+      scripts=['veegs/bin/VEEGS', 'veegs/bin/VEEGS-cohort',
+               'veegs/bin/VEEGS-subscribe', 'veegs/bin/VEEGS-monitor'],
       packages=['veegs'],
       package_data={'veegs': ['resources/*','*.ui']},
       license='MIT',
@@ -28,5 +29,6 @@ setup(name='veegs',
       ],
       keywords='lib EEG signal analysis',
 
-      install_requires = ['numpy', 'eeglib','PyQt5','pyqtgraph']
+      install_requires = ['numpy', 'eeglib','PyQt5','pyqtgraph', 'pandas',
+                         'pyedflib']
 )
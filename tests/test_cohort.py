@@ -0,0 +1,87 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from pyedflib import highlevel
+
+from veegs.cohort import runCohort
+from veegs.fileReaders import readBlocks, readChunk, readHeader, rowOffsets
+
+
+def _signals(nChannels, nSamples):
+    rng = np.random.default_rng(0)
+    return rng.standard_normal((nChannels, nSamples)) * 50
+
+
+@pytest.fixture
+def edfFile(tmp_path):
+    path = str(tmp_path / "recording.edf")
+    headers = highlevel.make_signal_headers(["C3", "C4"],
+                                            sample_frequency=256,
+                                            physical_min=-500,
+                                            physical_max=500)
+    highlevel.write_edf(path, _signals(2, 256 * 10), headers)
+    return path
+
+
+@pytest.fixture
+def csvFile(tmp_path):
+    """
+    A CSV file with a header and empty lines between the samples.
+    """
+    path = str(tmp_path / "recording.csv")
+    signals = _signals(3, 500)
+    with open(path, "w") as file:
+        file.write("a,b,c\n")
+        for i, row in enumerate(signals.T):
+            file.write(",".join("%r" % float(v) for v in row) + "\n")
+            if i % 7 == 0:
+                file.write("\n")
+    return path, signals
+
+
+def test_EDF_uses_its_own_sample_rate(edfFile):
+    nSamples, sampleRate, names = readHeader(edfFile, 128)
+    assert (nSamples, sampleRate, names) == (256 * 10, 256, ["C3", "C4"])
+
+
+def test_cohort_of_EDF_with_CSV_sample_rate(edfFile, tmp_path):
+    output = str(tmp_path / "features.csv")
+    runCohort([edfFile], ["PFD"], output, windowSeconds=1, stepSeconds=0.5,
+              sampleRate=128, workers=1, memoryLimit=2**16)
+    df = pd.read_csv(output)
+    #Windows of 256 samples every 128 samples
+    assert len(df) == (256 * 10 - 256) // 128 + 1
+    np.testing.assert_allclose(df["time(s)"], np.arange(len(df)) * 0.5)
+
+
+def test_CSV_chunks_skip_empty_lines(csvFile):
+    path, signals = csvFile
+    nSamples, _, names = readHeader(path, 100)
+    assert (nSamples, names) == (500, ["a", "b", "c"])
+
+    blocks = np.concatenate([block for _, block, _, _ in
+                             readBlocks(path, 64)], axis=1)
+    np.testing.assert_allclose(blocks, signals)
+
+    bounds = [(0, 100), (90, 250), (250, 251), (400, 500)]
+    offsets = rowOffsets(path, [start for start, _ in bounds])
+    for (start, stop), offset in zip(bounds, offsets):
+        np.testing.assert_allclose(readChunk(path, start, stop,
+                                             offset=offset),
+                                   signals[:, start:stop])
+        np.testing.assert_allclose(readChunk(path, start, stop),
+                                   signals[:, start:stop])
+
+
+def test_cohort_of_CSV_in_chunks(csvFile, tmp_path):
+    path, signals = csvFile
+    output = str(tmp_path / "features.csv")
+    runCohort([path], ["PFD"], output, windowSeconds=1, stepSeconds=0.5,
+              sampleRate=100, workers=1, memoryLimit=2**12)
+    chunked = pd.read_csv(output)
+    runCohort([path], ["PFD"], str(tmp_path / "whole.csv"), windowSeconds=1,
+              stepSeconds=0.5, sampleRate=100, workers=1)
+    whole = pd.read_csv(str(tmp_path / "whole.csv"))
+    assert len(chunked) == (500 - 100) // 50 + 1
+    pd.testing.assert_frame_equal(chunked, whole)
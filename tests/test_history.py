@@ -0,0 +1,35 @@
+import numpy as np
+
+from veegs.history import FeatureCache, FeatureHistory
+
+
+def test_cache_drops_the_least_recently_used_position():
+    cache = FeatureCache(capacity=3)
+    for position in range(3):
+        cache.put(position, {"a": position, "b": -position})
+    #Reading a position makes it the most recently used
+    assert cache.get(0) == {"a": 0, "b": 0}
+    cache.put(3, {"a": 3, "b": -3})
+
+    assert len(cache) == 3
+    assert cache.get(1) is None
+    assert cache.get(3) == {"a": 3, "b": -3}
+    assert cache.between(0, 3) == [2]
+    assert cache.between(-1, 4) == [0, 2, 3]
+
+
+def test_history_rebuilt_from_the_cache_after_seeking_back():
+    cache = FeatureCache()
+    history = FeatureHistory(capacity=16, factor=2, levels=3)
+    for position in range(10):
+        cache.put(position, {"a": position})
+        history.append(position, cache.get(position))
+
+    history.truncate(4)
+    for position in cache.between(3, 10):
+        history.append(position, cache.get(position))
+
+    time, means, _, _, aggregated = history.query(-np.inf, np.inf, 100)
+    assert not aggregated
+    np.testing.assert_array_equal(time, np.arange(10))
+    np.testing.assert_array_equal(means[:, 0], np.arange(10))
@@ -0,0 +1,109 @@
+import numpy as np
+import pytest
+
+from eeglib import features
+from eeglib.eeg import EEG
+
+from veegs import kernels
+
+#eeglib warns in the degenerate fits of the short and constant windows
+pytestmark = [pytest.mark.filterwarnings("ignore::RuntimeWarning"),
+              pytest.mark.filterwarnings("ignore:Polyfit may be poorly")]
+
+#Kernel and eeglib function of each feature
+pairs = {"PFD"   : (kernels.PFD,    features.PFD),
+         "HFD"   : (kernels.HFD,    features.HFD),
+         #features.LZC reads past the end of the sequence, its value is
+         #only deterministic with the padding of the fallback
+         "LZC"   : (kernels.LZC,    kernels._eeglibLZC),
+         "DFA"   : (kernels.DFA,    features.DFA),
+         "sampEn": (kernels.sampEn, features.sampEn)}
+
+
+def _window(nChannels, windowSize, seed=0):
+    """
+    A random walk with noise, closer to an EEG than white noise.
+    """
+    rng = np.random.default_rng(seed)
+    return (rng.standard_normal((nChannels, windowSize)) +
+            rng.standard_normal((nChannels, windowSize)).cumsum(1))
+
+
+def _reference(function, window):
+    return np.array([function(channel) for channel in window])
+
+
+@pytest.fixture(params=[True, False], ids=["compiled", "fallback"])
+def compiled(request, monkeypatch):
+    """
+    Runs a test with the kernels and with the fallback to eeglib.
+    """
+    if request.param and not kernels.available:
+        pytest.skip("Numba isn't available")
+    monkeypatch.setattr(kernels, "available", request.param)
+    return request.param
+
+
+@pytest.mark.parametrize("name", pairs)
+@pytest.mark.parametrize("windowSize", [16, 32, 128, 256, 1000])
+@pytest.mark.parametrize("seed", [0, 1])
+def test_matches_eeglib(compiled, name, windowSize, seed):
+    kernel, reference = pairs[name]
+    window = _window(4, windowSize, seed)
+    np.testing.assert_allclose(kernel(window), _reference(reference, window),
+                               rtol=1e-9, atol=1e-9)
+
+
+@pytest.mark.parametrize("name", pairs)
+def test_single_channel(compiled, name):
+    kernel, reference = pairs[name]
+    channel = _window(1, 256)[0]
+    assert np.ndim(kernel(channel)) == 0
+    assert kernel(channel) == pytest.approx(reference(channel), abs=1e-9)
+
+
+@pytest.mark.parametrize("name", pairs)
+def test_float32_window(name):
+    #The kernels accumulate in float64 and eeglib in float32
+    kernel, reference = pairs[name]
+    window = _window(3, 256).astype(np.float32)
+    np.testing.assert_allclose(kernel(window), _reference(reference, window),
+                               rtol=1e-5, atol=1e-6)
+
+
+@pytest.mark.parametrize("value", [0, 2.5])
+def test_constant_signals(compiled, value):
+    window = np.full((3, 64), value, dtype=float)
+    n = window.shape[1]
+    np.testing.assert_allclose(kernels.PFD(window), 1)
+    np.testing.assert_allclose(kernels.HFD(window), 1)
+    np.testing.assert_allclose(kernels.DFA(window), 0)
+    np.testing.assert_allclose(kernels.sampEn(window),
+                               _reference(features.sampEn, window))
+    #The sequence 00...0 has two components
+    np.testing.assert_allclose(kernels.LZC(window), 2 / (n / np.log2(n)))
+
+
+def test_shortest_HFD_window(compiled):
+    #kMax is 2, so the line is fitted to a single point
+    window = _window(3, 8)
+    np.testing.assert_allclose(kernels.HFD(window),
+                               _reference(features.HFD, window), rtol=1e-9)
+
+
+def test_MSE_is_the_sample_entropy_of_the_EEG():
+    window = _window(4, 256)
+    eeg = EEG(256, 256, 4)
+    eeg.set(window, columnMode=True)
+    np.testing.assert_allclose(kernels.batchedFeatures["MSE"](window),
+                               eeg.sampEn(), rtol=1e-9)
+
+
+def test_fallback_without_numba(monkeypatch):
+    window = _window(3, 128)
+    compiledValues = {name: kernel(window)
+                      for name, (kernel, _) in pairs.items()}
+    monkeypatch.setattr(kernels, "available", False)
+    for name, (kernel, _) in pairs.items():
+        np.testing.assert_allclose(kernel(window), compiledValues[name],
+                                   rtol=1e-9, atol=1e-9)
@@ -0,0 +1,149 @@
+import socket
+import sys
+import threading
+
+import pytest
+
+from veegs.publisher import (_Subscriber, _header, decode, encodeFrame,
+                             encodeSchema, SCHEMA)
+
+
+def _receiveAll(sock):
+    """
+    Returns the bytes available in a socket.
+    """
+    sock.setblocking(False)
+    data = b""
+    try:
+        while True:
+            chunk = sock.recv(65536)
+            if not chunk:
+                break
+            data += chunk
+    except BlockingIOError:
+        pass
+    return data
+
+
+def _readAll(sock):
+    """
+    Returns the decoded messages available in a socket.
+    """
+    return _decodeAll(_receiveAll(sock))
+
+
+def _decodeAll(data):
+    messages = []
+    offset = 0
+    while offset < len(data):
+        length, kind = _header.unpack_from(data, offset)
+        offset += _header.size
+        messages.append((kind, decode(kind, data[offset:offset + length])))
+        offset += length
+    return messages
+
+
+def _framesWithNames(messages):
+    """
+    Pairs each frame with the names of the last schema of its stream, as a
+    subscriber does.
+    """
+    schemas = {}
+    frames = []
+    for kind, message in messages:
+        if kind == SCHEMA:
+            schemas[message[0]] = message[2]
+        else:
+            stream, recordingTime, _, values = message
+            frames.append((recordingTime, schemas[stream], values))
+    return frames
+
+
+@pytest.fixture
+def pair():
+    a, b = socket.socketpair()
+    yield a, b
+    a.close()
+    b.close()
+
+
+def test_schema_change_keeps_queued_frames_with_their_schema(pair):
+    sender, receiver = pair
+    subscriber = _Subscriber(sender, queueSize=16)
+
+    subscriber.pushSchema(encodeSchema(0, "window", ["a", "b"]))
+    subscriber.push(encodeFrame(0, 1.0, [1, 2]))
+    subscriber.push(encodeFrame(0, 2.0, [3, 4]))
+    #The schema changes while the previous frames are still queued
+    subscriber.pushSchema(encodeSchema(0, "window", ["c"]))
+    subscriber.push(encodeFrame(0, 3.0, [5]))
+    subscriber.send()
+
+    frames = _framesWithNames(_readAll(receiver))
+    assert frames == [(1.0, ["a", "b"], (1, 2)),
+                      (2.0, ["a", "b"], (3, 4)),
+                      (3.0, ["c"], (5,))]
+
+
+def test_full_queue_drops_frames_but_not_schemas(pair):
+    sender, receiver = pair
+    subscriber = _Subscriber(sender, queueSize=2)
+
+    subscriber.pushSchema(encodeSchema(0, "window", ["a"]))
+    subscriber.push(encodeFrame(0, 1.0, [1]))
+    subscriber.pushSchema(encodeSchema(0, "window", ["b", "c"]))
+    subscriber.push(encodeFrame(0, 2.0, [2, 3]))
+    subscriber.push(encodeFrame(0, 3.0, [4, 5]))
+
+    assert subscriber.dropped == 1
+    subscriber.send()
+    messages = _readAll(receiver)
+    assert [kind for kind, _ in messages].count(SCHEMA) == 2
+    assert _framesWithNames(messages) == [(2.0, ["b", "c"], (2, 3)),
+                                          (3.0, ["b", "c"], (4, 5))]
+
+
+def test_push_while_sending_from_another_thread(pair):
+    #Switching threads often makes the interleavings more likely
+    interval = sys.getswitchinterval()
+    sys.setswitchinterval(1e-6)
+    try:
+        _pushWhileSending(*pair)
+    finally:
+        sys.setswitchinterval(interval)
+
+
+def _pushWhileSending(sender, receiver):
+    sender.setblocking(False)
+    subscriber = _Subscriber(sender, queueSize=8)
+    subscriber.pushSchema(encodeSchema(0, "window", ["a"]))
+    nFrames = 20000
+    errors = []
+
+    def publish():
+        try:
+            for i in range(nFrames):
+                subscriber.push(encodeFrame(0, float(i), [i]))
+        except Exception as e:
+            errors.append(e)
+
+    thread = threading.Thread(target=publish)
+    thread.start()
+    #A message can be split between two reads, so they are decoded at the end
+    data = b""
+    while thread.is_alive() or subscriber.hasData():
+        try:
+            subscriber.send()
+        except Exception as e:
+            errors.append(e)
+            break
+        data += _receiveAll(receiver)
+    thread.join()
+    messages = _decodeAll(data + _receiveAll(receiver))
+
+    assert errors == []
+    assert subscriber.nFrames == 0
+    times = [recordingTime for recordingTime, _, _ in
+             _framesWithNames(messages)]
+    assert times == sorted(times)
+    assert len(times) + subscriber.dropped == nFrames
@@ -0,0 +1,35 @@
+import numpy as np
+import pytest
+
+from veegs.sharedData import SharedWorkerPool
+
+
+@pytest.fixture
+def pool():
+    data = np.random.default_rng(0).standard_normal((10, 1000))
+    pool = SharedWorkerPool(data, workers=4, slots=8)
+    yield pool
+    pool.close()
+
+
+def test_one_job_uses_every_worker(pool):
+    parts = pool._split(range(10), 1)
+    assert len(parts) == 4
+    assert sum(parts, []) == list(range(10))
+
+
+def test_the_ranges_fit_in_the_slots(pool):
+    assert len(pool._split(range(10), 3)) == 2
+    assert len(pool._split(range(10), 8)) == 1
+    assert pool._split([3], 1) == [[3]]
+
+
+def test_results_in_the_order_of_the_channels(pool):
+    data = pool.recording.array
+    channels = [9, 0, 4, 2, 7, 1, 3]
+    values = pool.map([(np.std, 100, 256, channels),
+                       (np.mean, 0, 512, channels[:2]),
+                       (np.mean, 0, 512, [])])
+    np.testing.assert_allclose(values[0], data[channels, 100:356].std(1))
+    np.testing.assert_allclose(values[1], data[channels[:2], :512].mean(1))
+    assert len(values[2]) == 0
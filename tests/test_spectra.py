@@ -0,0 +1,75 @@
+import numpy as np
+import pytest
+
+from eeglib.eeg import EEG, defaultBands
+
+from veegs import spectra
+
+
+def _window(nChannels, windowSize, seed=0):
+    rng = np.random.default_rng(seed)
+    return (rng.standard_normal((nChannels, windowSize)) +
+            rng.standard_normal((nChannels, windowSize)).cumsum(1))
+
+
+def _eeg(window, sampleRate):
+    eeg = EEG(window.shape[1], sampleRate, window.shape[0])
+    eeg.set(window, columnMode=True)
+    return eeg
+
+
+@pytest.fixture(params=["numpy", "scipy"])
+def backend(request):
+    previous = spectra.getBackend()
+    spectra.setBackend(request.param)
+    yield request.param
+    spectra._backend = previous
+
+
+@pytest.mark.parametrize("windowSize", [64, 250, 256, 1000, 1024])
+@pytest.mark.parametrize("sampleRate", [128, 250, 256, 512])
+def test_band_power_matches_eeglib(backend, windowSize, sampleRate):
+    window = _window(4, windowSize)
+    values = spectra.bandPower(spectra.magnitudes(window), windowSize,
+                               sampleRate)
+    expected = [[channel[band] for band in defaultBands]
+                for channel in _eeg(window, sampleRate).bandPower()]
+    np.testing.assert_allclose(values, expected, rtol=1e-9, atol=1e-9)
+
+
+@pytest.mark.parametrize("windowSize", [128, 250, 1024])
+@pytest.mark.parametrize("sampleRate", [128, 256])
+def test_average_band_values_are_the_mean_magnitudes(backend, windowSize,
+                                                     sampleRate):
+    window = _window(4, windowSize)
+    magnitudes = np.abs(np.fft.fft(window * np.hanning(windowSize + 1)[:-1]))
+    eeg = _eeg(window, sampleRate)
+    expected = [[channel[slice(*eeg.getBoundsForBand(bounds))].mean()
+                 for bounds in defaultBands.values()]
+                for channel in magnitudes]
+    values = spectra.averageBandValues(spectra.magnitudes(window), windowSize,
+                                       sampleRate)
+    np.testing.assert_allclose(values, expected, rtol=1e-9)
+
+
+@pytest.mark.parametrize("windowSize", [256, 1000])
+def test_engagement_level_matches_eeglib(backend, windowSize):
+    window = _window(4, windowSize)
+    values = spectra.bandPower(spectra.magnitudes(window), windowSize, 256)
+    assert (spectra.engagementLevel(values) ==
+            pytest.approx(_eeg(window, 256).engagementLevel(), rel=1e-9))
+
+
+def test_float32_spectra(backend):
+    window = _window(4, 256)
+    values = spectra.bandPower(spectra.magnitudes(window.astype(np.float32)),
+                               256, 256)
+    assert values.dtype == np.float32
+    np.testing.assert_allclose(values,
+                               spectra.bandPower(spectra.magnitudes(window),
+                                                 256, 256), rtol=1e-5)
+
+
+def test_scipy_backend_uses_one_thread_by_default():
+    assert spectra.ScipyBackend().workers == 1
+    assert spectra.ScipyBackend(4).workers == 4
@@ -0,0 +1,128 @@
+"""
+This module defines the classes used to store the annotations of a recording
+and to draw them over the plots.
+"""
+
+import os
+
+import numpy as np
+
+import pyqtgraph as pg
+
+from pyedflib import EdfReader
+
+
+class AnnotationIndex():
+    """
+    This class stores the annotations of a recording so the ones inside a
+    range of time are found without going through all of them.
+
+    The annotations are grouped in classes of durations that are powers of
+    two, and each class is sorted by onset. An annotation can only overlap a
+    range if its onset is after the start of the range minus the longest
+    duration of its class, so the annotations checked in each class are about
+    the ones found, and a few long annotations don't make the short ones be
+    checked in every query.
+    """
+    #Durations shorter than this are in the same class
+    minDuration = 2.0**-10
+
+    def __init__(self, onsets=(), durations=(), descriptions=()):
+        onsets    = np.asarray(onsets, dtype=float)
+        durations = np.clip(np.asarray(durations, dtype=float), 0, None)
+
+        order = np.argsort(onsets, kind="stable")
+        self.onsets       = onsets[order]
+        self.ends         = self.onsets + durations[order]
+        self.descriptions = np.asarray(descriptions, dtype=str)[order]
+
+        #Indexes of the annotations of each class, sorted by onset, with the
+        #onsets and the longest duration of the class
+        durations = self.ends - self.onsets
+        exponents = np.frexp(np.maximum(durations, self.minDuration))[1]
+        self.classes = []
+        for exponent in np.unique(exponents):
+            indexes = np.flatnonzero(exponents == exponent)
+            self.classes.append((indexes, self.onsets[indexes],
+                                 durations[indexes].max()))
+
+    @classmethod
+    def fromFile(cls, path):
+        """
+        Returns the annotations of a file. Only EDF files have them, for other
+        files the index is empty.
+        """
+        if os.path.splitext(path)[1].lower() != ".edf":
+            return cls()
+
+        reader = EdfReader(path)
+        try:
+            onsets, durations, descriptions = reader.readAnnotations()
+        finally:
+            reader.close()
+        return cls(onsets, durations, descriptions)
+
+    def __len__(self):
+        return len(self.onsets)
+
+    def query(self, start, end):
+        """
+        Returns the indexes of the annotations that overlap [start, end],
+        sorted by onset.
+        """
+        found = []
+        for indexes, onsets, maxDuration in self.classes:
+            first = np.searchsorted(onsets, start - maxDuration, "left")
+            last  = np.searchsorted(onsets, end,                 "right")
+            candidates = indexes[first:last]
+            found.append(candidates[self.ends[candidates] >= start])
+        if not found:
+            return np.empty(0, dtype=int)
+        return np.sort(np.concatenate(found))
+
+
+class AnnotationOverlay():
+    """
+    This class draws the annotations of the visible range of a plot. The
+    region items are created once and reused, so each frame only moves the
+    ones needed for the annotations in view. If there are more than
+    maxRegions annotations in view, only the first ones are drawn and a label
+    tells how many are hidden.
+    """
+    brush = pg.mkBrush(255, 200, 0, 50)
+
+    def __init__(self, plotter, maxRegions=100):
+        self.plotter    = plotter
+        self.maxRegions = maxRegions
+        self.regions    = []
+
+        self.label = pg.TextItem(color=(255, 200, 0), anchor=(0, 0))
+        self.label.setZValue(20)
+        self.plotter.addItem(self.label, ignoreBounds=True)
+        self.label.hide()
+
+    def update(self, annotations, start, end):
+        found  = annotations.query(start, end)
+        events = found[:self.maxRegions]
+
+        while len(self.regions) < len(events):
+            region = pg.LinearRegionItem(movable=False, brush=self.brush)
+            self.plotter.addItem(region, ignoreBounds=True)
+            self.regions.append(region)
+
+        for region, i in zip(self.regions, events):
+            region.setRegion((annotations.onsets[i], annotations.ends[i]))
+            region.setToolTip(annotations.descriptions[i])
+            region.show()
+
+        for region in self.regions[len(events):]:
+            region.hide()
+
+        if len(found) > len(events):
+            top = self.plotter.getViewBox().viewRange()[1][1]
+            self.label.setText("%d of %d annotations shown" %
+                               (len(events), len(found)))
+            self.label.setPos(start, top)
+            self.label.show()
+        else:
+            self.label.hide()
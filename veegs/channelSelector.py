@@ -1,125 +1,210 @@
-from PyQt5 import QtWidgets
+from PyQt5 import QtCore, QtWidgets
 import numpy as np
 
+class ChannelModel(QtCore.QAbstractListModel):
+    """
+    This is a checkable list model that stores which channels are selected. It
+    can be shared by several views, so all of them show the same selection
+    without copying it.
+    """
+    #Emitted once per change with the number of checked channels
+    checkedChanged = QtCore.pyqtSignal(int)
+
+    def __init__(self, nChannels, names=None, parent=None):
+        super().__init__(parent)
+
+        if names:
+            self.names = list(names)
+        else:
+            self.names = [str(i) for i in range(nChannels)]
+
+        self.checked  = np.zeros(nChannels, dtype=bool)
+        self.nChecked = 0
+
+    def rowCount(self, parent=QtCore.QModelIndex()):
+        if parent.isValid():
+            return 0
+        return len(self.checked)
+
+    def data(self, index, role=QtCore.Qt.DisplayRole):
+        if not index.isValid():
+            return None
+
+        row = index.row()
+        if role == QtCore.Qt.DisplayRole:
+            return self.names[row]
+        elif role == QtCore.Qt.CheckStateRole:
+            return QtCore.Qt.Checked if self.checked[row] else\
+                   QtCore.Qt.Unchecked
+        return None
+
+    def setData(self, index, value, role=QtCore.Qt.EditRole):
+        if role != QtCore.Qt.CheckStateRole or not index.isValid():
+            return False
+
+        self.setChecked([index.row()], value == QtCore.Qt.Checked)
+        return True
+
+    def flags(self, index):
+        return (QtCore.Qt.ItemIsEnabled | QtCore.Qt.ItemIsSelectable |
+                QtCore.Qt.ItemIsUserCheckable)
+
+    def setChecked(self, rows, state):
+        """
+        Changes the state of the given rows. Only the rows whose state really
+        changes are notified to the views.
+        """
+        rows = np.asarray(rows, dtype=int)
+        changed = rows[self.checked[rows] != state]
+        if len(changed) == 0:
+            return
+
+        self.checked[changed] = state
+        self.nChecked += len(changed) if state else -len(changed)
+
+        #One dataChanged signal for each run of consecutive rows
+        changed.sort()
+        splits = np.flatnonzero(np.diff(changed) != 1) + 1
+        for run in np.split(changed, splits):
+            self.dataChanged.emit(self.index(run[0]), self.index(run[-1]),
+                                  [QtCore.Qt.CheckStateRole])
+
+        self.checkedChanged.emit(self.nChecked)
+
+    def setAll(self, state):
+        self.setChecked(np.arange(len(self.checked)), state)
+
+    def setChannel(self, channel):
+        self.setAll(False)
+        self.setChecked(list(channel), True)
+
+    def getChannel(self):
+        return np.flatnonzero(self.checked).tolist()
+
+
 class ChannelSelector(QtWidgets.QGroupBox):
     """
     This is a widget to select the channel to use when using a feature.
+    Channels can be filtered by name with a regular expression and a range of
+    them can be checked at once by selecting it with shift or ctrl.
     """
     def __init__(self, nChannels, parent=None, names = None,
-                                   title="Channel Selector"):
+                                   title="Channel Selector", model = None):
         QtWidgets.QGroupBox.__init__(self, parent)
-        
+
         self.setTitle(title)
-        self.channel = set()        #Default Channel
-        
+
+        #The model can be shared with other selectors
+        if model is None:
+            model = ChannelModel(nChannels, names, self)
+        self.model = model
+
         layout = QtWidgets.QVBoxLayout()
         self.setLayout(layout)
-         
+
         self.selectAll = QtWidgets.QCheckBox("Select All")
-        layout.addWidget(self.selectAll)        
-        layout.addWidget(self._initInnerCBs(nChannels, names))
-        
+        layout.addWidget(self.selectAll)
+
+        self.filterInput = QtWidgets.QLineEdit()
+        self.filterInput.setPlaceholderText("Filter (regular expression)")
+        layout.addWidget(self.filterInput)
+
+        layout.addWidget(self._initView())
+        layout.addLayout(self._initRangeButtons())
+
         self.nChannels = nChannels
-        
-        def toggleAll(toggled):
-            for cb in self.cbs:
-                cb.setChecked(toggled)
-            
-        self.selectAll.toggled.connect(toggleAll)
-        
-    def _initInnerCBs(self, nChannels, names):
-        container = QtWidgets.QFrame()
-        container.setFrameStyle(QtWidgets.QFrame.Plain | 
-                                QtWidgets.QFrame.Panel  )
-
-        grid = QtWidgets.QGridLayout()
-        container.setLayout(grid)
-        
-        #Number of rows of the layout. It's the squared root of the number of
-        #channels
-        rows = int(np.ceil(np.sqrt(nChannels)))
-        
-        #This is a callback that change the channel when another one is
-        #selected
-        def setChannel(toggled, chann):
-            if toggled:
-                self.channel.add(chann)
-            elif chann in self.channel:
-                self.channel.remove(chann)
-        
-        self.cbs = []
-        #This loop go through the rows and adds a checkBox for each channel
-        for i in range(rows):
-            for j in range(rows):
-                if nChannels > 0:  #Checking if all the channels has ben added
-                    nChannels -= 1
-                    
-                    channel = i * rows + j
-                    if names:
-                        name = names[channel]
-                    else:
-                        name=str(channel)
-                        
-                    rb = QtWidgets.QCheckBox(name)
-                        
-                    rb.toggled.connect(
-                     lambda toggled, chann=channel: setChannel(toggled, chann))
-                    
-                    self.cbs.append(rb)
-                    grid.addWidget(rb, i, j)
-        
-        return container
-    
-    def synchronize(self, synchronizer):
-        f = lambda _:synchronizer.synchronizeChannel(self.channel)
-        synchronizer.selectors.append(self)
-        for cb in self.cbs:
-            cb.clicked.connect(f)
-        self.selectAll.clicked.connect(synchronizer.synchronizeSelectAll)
-    
+
+        self.selectAll.clicked.connect(self._toggleAll)
+        self.model.checkedChanged.connect(self._updateSelectAll)
+        self._updateSelectAll(self.model.nChecked)
+
+    def _initView(self):
+        self.proxy = QtCore.QSortFilterProxyModel(self)
+        self.proxy.setSourceModel(self.model)
+        self.proxy.setFilterCaseSensitivity(QtCore.Qt.CaseInsensitive)
+        self.filterInput.textChanged.connect(
+                            lambda text: self.proxy.setFilterRegExp(text))
+
+        #The items are laid in a grid as the old checkboxes were, but only the
+        #visible ones are painted
+        view = QtWidgets.QListView()
+        view.setViewMode(QtWidgets.QListView.IconMode)
+        view.setFlow(QtWidgets.QListView.LeftToRight)
+        view.setWrapping(True)
+        view.setResizeMode(QtWidgets.QListView.Adjust)
+        view.setMovement(QtWidgets.QListView.Static)
+        view.setUniformItemSizes(True)
+        view.setLayoutMode(QtWidgets.QListView.Batched)
+        view.setSelectionMode(QtWidgets.QAbstractItemView.ExtendedSelection)
+        view.setModel(self.proxy)
+
+        self.view = view
+        return view
+
+    def _initRangeButtons(self):
+        layout = QtWidgets.QHBoxLayout()
+
+        checkButton   = QtWidgets.QPushButton("Check Selected")
+        uncheckButton = QtWidgets.QPushButton("Uncheck Selected")
+        checkButton  .clicked.connect(lambda: self._checkSelected(True))
+        uncheckButton.clicked.connect(lambda: self._checkSelected(False))
+
+        layout.addWidget(checkButton)
+        layout.addWidget(uncheckButton)
+        return layout
+
+    def _visibleRows(self):
+        """
+        Returns the rows of the model that pass the current filter.
+        """
+        if self.filterInput.text() == "":
+            return np.arange(self.model.rowCount())
+
+        return [self.proxy.mapToSource(self.proxy.index(i, 0)).row()
+                for i in range(self.proxy.rowCount())]
+
+    def _checkSelected(self, state):
+        indexes = self.view.selectionModel().selectedIndexes()
+        rows = [self.proxy.mapToSource(index).row() for index in indexes]
+        self.model.setChecked(rows, state)
+
+    def _toggleAll(self, toggled):
+        self.model.setChecked(self._visibleRows(), toggled)
+
+    def _updateSelectAll(self, nChecked):
+        self.selectAll.blockSignals(True)
+        self.selectAll.setChecked(nChecked == self.model.rowCount() > 0)
+        self.selectAll.blockSignals(False)
+
+    @property
+    def channel(self):
+        return set(self.model.getChannel())
+
     def setChannel(self, channel):
-        self.channel = channel
-        for i, cb in enumerate(self.cbs):
-            if i in channel:
-                checked = True
-            else:
-                checked = False
-            cb.setChecked(checked)
-    
+        self.model.setChannel(channel)
+
     def getChannel(self):
-        return list(self.channel)
-    
-class Synchronizer():
-    def __init__(self):
-        self.selectors = []
-        
-    def synchronizeChannel(self, channels):
-        for selector in self.selectors:
-            selector.setChannel(channels)
-    
-    def synchronizeSelectAll(self, state):
-        for selector in self.selectors:
-            selector.selectAll.setChecked(state)
-            
+        return self.model.getChannel()
+
 class ChannelSelectorDialog(QtWidgets.QDialog):
     def __init__(self, nChannels, names, parent=None):
         super().__init__(parent)
-        
+
         #Add layout
         layout = QtWidgets.QVBoxLayout()
         self.setLayout(layout)
-        
+
         #Add channelSelector widget
         self.channelSelector = ChannelSelector(nChannels, names = names)
         layout.addWidget(self.channelSelector)
-        self.channelSelector.selectAll.setChecked(True)
-        
+        self.channelSelector.model.setAll(True)
+
         #Add buttons
         buttonBox = QtWidgets.QDialogButtonBox(QtWidgets.QDialogButtonBox.Ok  |
                                              QtWidgets.QDialogButtonBox.Cancel)
         layout.addWidget(buttonBox)
         buttonBox.accepted.connect(self.accept)
         buttonBox.rejected.connect(self.reject)
-    
+
     def getChannel(self):
-        return list(self.channelSelector.channel)
\ No newline at end of file
+        return self.channelSelector.getChannel()
@@ -0,0 +1,391 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+This module computes the same features for a cohort of recordings. Every file
+is split into chunks of windows and the chunks are processed in parallel by a
+pool of processes. The results of each chunk are written to disk as soon as
+they are ready, so an interrupted run can be resumed.
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import sys
+import time
+
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from itertools import combinations
+
+import numpy as np
+import pandas as pd
+
+from eeglib.helpers import Helper
+import eeglib.wrapper as wrap
+
+from .fileReaders import isSupported, readHeader, readChunk, rowOffsets
+from . import plugins
+
+# Features that can be computed for a cohort, besides the plugins
+cohortFeatures = ["HFD", "PFD", "hjorthActivity", "hjorthMobility",
+                  "hjorthComplexity", "MSE", "LZC", "DFA", "engagementLevel"]
+
+# Times the size of the raw chunk that a worker is expected to use
+_memoryOverhead = 4
+
+timeField = "time(s)"
+fileField = "file"
+
+#Version of the parts and the journal, it is part of the configuration
+_journalVersion = 2
+
+
+def findFiles(source):
+    """
+    Returns the files of a cohort. The source can be a directory, whose EDF
+    and CSV files are returned, or a manifest with a path in each line. Paths
+    in a manifest are relative to it and lines starting with "#" are ignored.
+    """
+    if os.path.isdir(source):
+        files = [os.path.join(source, name)
+                 for name in sorted(os.listdir(source))]
+        return [f for f in files if os.path.isfile(f) and isSupported(f)]
+
+    baseDir = os.path.dirname(os.path.abspath(source))
+    with open(source) as manifest:
+        lines = [line.strip() for line in manifest]
+    return [os.path.join(baseDir, line) for line in lines
+            if line and not line.startswith("#")]
+
+
+def chunkWindows(nChannels, windowSize, step, memoryLimit,
+                 dtype=np.float64):
+    """
+    Returns the number of windows a chunk can have so that the memory used by
+    a worker stays within memoryLimit bytes.
+    """
+    bytesPerSample = nChannels * np.dtype(dtype).itemsize * _memoryOverhead
+    samples = memoryLimit // bytesPerSample
+    return max(1, (samples - windowSize) // step + 1)
+
+
+def fileKey(path):
+    """
+    Returns a key that identifies a file by its path, size and modification
+    time, so the parts of a file aren't reused if it is moved or modified.
+    """
+    stat = os.stat(path)
+    identity = "%s|%d|%d" % (os.path.abspath(path), stat.st_size,
+                             stat.st_mtime_ns)
+    return hashlib.sha1(identity.encode()).hexdigest()[:16]
+
+
+def makeJobs(fileId, path, sampleRate, nSamples, windowSize, step,
+             windowsPerChunk, dtype=np.float64):
+    """
+    Splits a file in jobs. Consecutive chunks overlap so the windows are the
+    same ones that would be obtained processing the whole file.
+    """
+    key = fileKey(path)
+    nWindows = (nSamples - windowSize) // step + 1
+    jobs = []
+    for first in range(0, nWindows, windowsPerChunk):
+        last = min(first + windowsPerChunk, nWindows) - 1
+        start = first * step
+        stop  = last * step + windowSize
+        jobs.append({"file": fileId, "key": key, "path": path,
+                     "sampleRate": sampleRate,
+                     "start": start, "stop": stop, "windowSize": windowSize,
+                     "step": step, "dtype": dtype})
+    return jobs
+
+
+def _jobKey(job):
+    return "%s_%d_%d" % (job["key"], job["start"], job["stop"])
+
+
+def _configHash(features, windowSeconds, stepSeconds, sampleRate,
+                memoryLimit, dtype):
+    """
+    Returns a hash of the settings that change the parts of a run. The
+    plugins are identified by the module and name of their function.
+    """
+    pluginIds = {feature: "%s.%s" % (plugins.registry[feature].function
+                                     .__module__,
+                                     plugins.registry[feature].function
+                                     .__qualname__)
+                 for feature in features if feature in plugins.registry}
+    config = {"version"      : _journalVersion,
+              "features"     : list(features),
+              "plugins"      : pluginIds,
+              "windowSeconds": windowSeconds,
+              "stepSeconds"  : stepSeconds,
+              "sampleRate"   : sampleRate,
+              "memoryLimit"  : memoryLimit,
+              "dtype"        : np.dtype(dtype).name}
+    return hashlib.sha1(json.dumps(config, sort_keys=True).encode())\
+                  .hexdigest()
+
+
+def _computePlugins(pluginFeatures, data, job):
+    """
+    Computes the plugins over all the windows of a chunk. The windows are
+    given to the plugins in batches with as many samples as the chunk, so the
+    memory used doesn't grow with the overlap of the windows.
+    """
+    windowSize, step = job["windowSize"], job["step"]
+    windows = plugins.slidingWindows(data, windowSize, step)
+    pairs = list(combinations(range(len(data)), 2))
+    batchSize = max(1, data.shape[1] // windowSize)
+
+    values = [np.concatenate(batchValues) for batchValues in zip(*(
+              plugins.computePlugins(pluginFeatures,
+                                     windows[first:first + batchSize],
+                                     job["sampleRate"], pairs)
+              for first in range(0, len(windows), batchSize)))]
+
+    columns = {}
+    for plugin, pluginValues in zip(pluginFeatures, values):
+        names = pairs if plugin.twoChannels else range(len(data))
+        for i, name in enumerate(names):
+            columns["%s_%s" % (plugin.key, name)] = pluginValues[:, i]
+    return pd.DataFrame(columns)
+
+
+def _computeJob(job, features, partsDir):
+    """
+    Computes the features of one chunk and writes them to partsDir. It runs in
+    the worker processes, so only the job description is sent to them.
+    """
+    t0 = time.perf_counter()
+
+    #The worker processes can be started without the plugins loaded
+    plugins.discover()
+    pluginFeatures  = [plugins.registry[feature] for feature in features
+                       if feature in plugins.registry]
+    wrapperFeatures = [feature for feature in features
+                       if feature not in plugins.registry]
+
+    data = readChunk(job["path"], job["start"], job["stop"], job["dtype"],
+                     job["offset"])
+
+    parts = []
+    if wrapperFeatures:
+        helper = Helper(data, sampleRate=job["sampleRate"],
+                        windowSize=job["windowSize"])
+        helper.prepareIterator(step=job["step"])
+
+        wrapper = wrap.Wrapper(helper, flat=True)
+        for feature in wrapperFeatures:
+            wrapper.addFeature(feature)
+        parts.append(wrapper.getAllFeatures())
+    if pluginFeatures:
+        parts.append(_computePlugins(pluginFeatures, data, job))
+
+    df = pd.concat(parts, axis=1)
+    df.insert(0, timeField, (job["start"] + job["step"]*
+                             pd.RangeIndex(len(df))) / job["sampleRate"])
+    df.insert(0, fileField, job["path"])
+
+    partPath = os.path.join(partsDir, _jobKey(job) + ".csv")
+    df.to_csv(partPath + ".tmp", index=False)
+    os.replace(partPath + ".tmp", partPath)
+
+    return _jobKey(job), len(df), time.perf_counter() - t0
+
+
+def _readJournal(journalPath):
+    """
+    Returns the hash of the configuration of the run that wrote the journal,
+    or None if it has no header, and the finished jobs by their key.
+    """
+    config = None
+    done = {}
+    if os.path.exists(journalPath):
+        with open(journalPath) as journal:
+            for line in journal:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    #A line can be truncated if the run was interrupted
+                    continue
+                if "config" in entry:
+                    config = entry["config"]
+                elif "job" in entry:
+                    done[entry["job"]] = entry
+    return config, done
+
+
+def _clearParts(partsDir):
+    for name in os.listdir(partsDir):
+        if name.endswith((".csv", ".csv.tmp")) or name == "journal.jsonl":
+            os.remove(os.path.join(partsDir, name))
+
+
+def runCohort(files, features, output, windowSeconds=1, stepSeconds=0.125,
+              sampleRate=None, workers=None, memoryLimit=512*2**20,
+              resume=True, progress=None, dtype=np.float64):
+    """
+    Computes the features of every file and merges them in one table.
+
+    Parameters
+    ----------
+    files: list of str
+        The paths of the EDF or CSV files.
+    features: list of str
+        The names of the features, as they are named in the wrapper, or the
+        keys of the plugins.
+    output: str
+        The path of the CSV file with the merged results. The timing
+        statistics are written next to it with the suffix "_timing".
+    windowSeconds, stepSeconds: float
+        The size of the windows and the distance between them in seconds.
+    sampleRate: numeric, optional
+        The sample rate of the CSV files.
+    workers: int, optional
+        The number of processes. By default, the number of cores.
+    memoryLimit: int
+        The maximum number of bytes of data that a worker loads at once.
+    resume: bool
+        If True, the chunks computed by a previous run are not computed again.
+        The previous run must have used the same features, windows, sample
+        rate, memory limit and dtype, otherwise a ValueError is raised. If
+        False, the results of the previous run are deleted.
+    progress: callable, optional
+        It is called with the number of finished and total jobs.
+    dtype: numpy.dtype
+        The type in which the samples are loaded. numpy.float32 halves the
+        memory used by each chunk.
+
+    Returns
+    -------
+    pandas.DataFrame
+        The timing statistics of each file.
+    """
+    plugins.discover()
+
+    partsDir = os.path.splitext(output)[0] + "_parts"
+    os.makedirs(partsDir, exist_ok=True)
+    journalPath = os.path.join(partsDir, "journal.jsonl")
+    if not resume:
+        _clearParts(partsDir)
+
+    config = _configHash(features, windowSeconds, stepSeconds, sampleRate,
+                         memoryLimit, dtype)
+    journalConfig, done = _readJournal(journalPath)
+    if os.path.exists(journalPath) and journalConfig != config:
+        raise ValueError("The previous run in %s used different settings. "
+                         "Run it with the same settings, or without resuming "
+                         "(--restart) to start it again." % partsDir)
+    if not os.path.exists(journalPath):
+        with open(journalPath, "w") as journal:
+            journal.write(json.dumps({"config": config}) + "\n")
+
+    #Jobs of every file
+    jobs = []
+    for fileId, path in enumerate(files):
+        nSamples, fileRate, names = readHeader(path, sampleRate)
+        windowSize = int(round(windowSeconds * fileRate))
+        step = max(1, int(round(stepSeconds * fileRate)))
+        if nSamples < windowSize:
+            continue
+        windowsPerChunk = chunkWindows(len(names), windowSize, step,
+                                       memoryLimit, dtype)
+        fileJobs = makeJobs(fileId, path, fileRate, nSamples, windowSize,
+                            step, windowsPerChunk, dtype)
+        #The workers seek to the first row of their chunk, so a CSV file is
+        #read once here instead of once per chunk
+        offsets = rowOffsets(path, [job["start"] for job in fileJobs])
+        for job, offset in zip(fileJobs, offsets):
+            job["offset"] = offset
+        jobs += fileJobs
+
+    pending = [job for job in jobs if not (_jobKey(job) in done and
+               os.path.exists(os.path.join(partsDir, _jobKey(job) + ".csv")))]
+
+    #Idle workers take the next job from the shared queue, so a worker that
+    #finishes early keeps taking chunks while others are still busy
+    finished = len(jobs) - len(pending)
+    if progress:
+        progress(finished, len(jobs))
+    with ProcessPoolExecutor(max_workers=workers) as pool, \
+         open(journalPath, "a") as journal:
+        futures = [pool.submit(_computeJob, job, features, partsDir)
+                   for job in pending]
+        for future in as_completed(futures):
+            key, nWindows, seconds = future.result()
+            done[key] = {"job": key, "windows": nWindows, "seconds": seconds}
+            journal.write(json.dumps(done[key]) + "\n")
+            journal.flush()
+
+            finished += 1
+            if progress:
+                progress(finished, len(jobs))
+
+    #Merging the results in the order of the files
+    parts = [pd.read_csv(os.path.join(partsDir, _jobKey(job) + ".csv"))
+             for job in jobs]
+    if parts:
+        pd.concat(parts, ignore_index=True).to_csv(output, index=False)
+
+    timing = pd.DataFrame([{fileField: job["path"],
+                            "windows": done[_jobKey(job)]["windows"],
+                            "seconds": done[_jobKey(job)]["seconds"]}
+                           for job in jobs])
+    if len(timing):
+        stats = timing.groupby(fileField, sort=False).agg(
+                    chunks    = ("seconds", "size"),
+                    windows   = ("windows", "sum"),
+                    seconds   = ("seconds", "sum"),
+                    meanChunk = ("seconds", "mean"),
+                    maxChunk  = ("seconds", "max"))
+        stats["windowsPerSecond"] = stats["windows"] / stats["seconds"]
+    else:
+        stats = pd.DataFrame()
+    stats.to_csv(os.path.splitext(output)[0] + "_timing.csv")
+
+    return stats
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Computes features for a "+
+                                     "cohort of EDF/CSV files.")
+    parser.add_argument("source", help="A directory or a manifest file with "+
+                        "one path per line.")
+    parser.add_argument("output", help="The CSV file for the results.")
+    parser.add_argument("-f", "--features", default="HFD,PFD",
+                        help="Comma separated features. Available: " +
+                        ", ".join(cohortFeatures + list(plugins.discover())))
+    parser.add_argument("-w", "--window", type=float, default=1,
+                        help="Window size in seconds.")
+    parser.add_argument("-s", "--step", type=float, default=0.125,
+                        help="Step between windows in seconds.")
+    parser.add_argument("-r", "--sample-rate", type=float, default=None,
+                        help="Sample rate of the CSV files.")
+    parser.add_argument("-j", "--workers", type=int, default=None,
+                        help="Number of processes. Default: all cores.")
+    parser.add_argument("-m", "--memory", type=float, default=512,
+                        help="Memory limit per worker in MiB.")
+    parser.add_argument("--float32", action="store_true",
+                        help="Load the samples in single precision.")
+    parser.add_argument("--restart", action="store_true",
+                        help="Ignore the results of a previous run.")
+    args = parser.parse_args(argv)
+
+    def printProgress(finished, total):
+        print("\r%d/%d chunks" % (finished, total), end="", file=sys.stderr)
+
+    try:
+        stats = runCohort(findFiles(args.source), args.features.split(","),
+                          args.output, args.window, args.step,
+                          args.sample_rate, args.workers,
+                          int(args.memory * 2**20), not args.restart,
+                          printProgress,
+                          np.float32 if args.float32 else np.float64)
+    except ValueError as e:
+        parser.error(str(e))
+    print(file=sys.stderr)
+    print(stats.to_string())
+
+if __name__ == '__main__':
+    main()
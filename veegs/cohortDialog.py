@@ -0,0 +1,186 @@
+import os
+
+import numpy as np
+from PyQt5 import QtCore, QtWidgets
+from PyQt5.QtCore import QObject, QThread, pyqtSlot, pyqtSignal
+
+from .cohort import cohortFeatures, findFiles, runCohort
+from . import plugins
+
+
+class CohortWorker(QObject):
+    """
+    This class runs a cohort in a separated thread so the GUI doesn't freeze.
+    """
+    sigProgress = pyqtSignal(int, int)
+    sigFinished = pyqtSignal(str)
+
+    def __init__(self, kargs):
+        super().__init__()
+        self.kargs = kargs
+
+    @pyqtSlot()
+    def run(self):
+        try:
+            stats = runCohort(progress=self.sigProgress.emit, **self.kargs)
+            self.sigFinished.emit(stats.to_string())
+        except Exception as e:
+            self.sigFinished.emit("Error: " + str(e))
+
+
+class CohortDialog(QtWidgets.QDialog):
+    """
+    This is a dialog for computing the same features for a directory or a
+    manifest of files.
+    """
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.setWindowTitle("Cohort")
+        self.setAttribute(QtCore.Qt.WA_DeleteOnClose)
+
+        layout = QtWidgets.QFormLayout()
+        self.setLayout(layout)
+
+        #Source and output
+        self.sourceInput = QtWidgets.QLineEdit()
+        sourceBox = QtWidgets.QHBoxLayout()
+        sourceBox.addWidget(self.sourceInput)
+        for text, browse in (("Directory...", self._browseDirectory),
+                             ("Manifest...",  self._browseManifest)):
+            button = QtWidgets.QPushButton(text)
+            button.clicked.connect(browse)
+            sourceBox.addWidget(button)
+        layout.addRow("Source", sourceBox)
+
+        self.outputInput = QtWidgets.QLineEdit()
+        outputBox = QtWidgets.QHBoxLayout()
+        outputBox.addWidget(self.outputInput)
+        outputButton = QtWidgets.QPushButton("Browse...")
+        outputButton.clicked.connect(self._browseOutput)
+        outputBox.addWidget(outputButton)
+        layout.addRow("Output", outputBox)
+
+        #Features
+        self.featuresList = QtWidgets.QListWidget()
+        for feature in cohortFeatures + list(plugins.discover()):
+            item = QtWidgets.QListWidgetItem(feature)
+            item.setCheckState(QtCore.Qt.Unchecked)
+            self.featuresList.addItem(item)
+        layout.addRow("Features", self.featuresList)
+
+        #Settings
+        self.windowInput = self._spinBox(0.01, 3600, 1)
+        layout.addRow("Window (s)", self.windowInput)
+        self.stepInput = self._spinBox(0.001, 3600, 0.125)
+        layout.addRow("Step (s)", self.stepInput)
+        self.sampleRateInput = self._spinBox(1, 100000, 128)
+        layout.addRow("CSV sample rate", self.sampleRateInput)
+        self.workersInput = QtWidgets.QSpinBox()
+        self.workersInput.setRange(1, 1024)
+        self.workersInput.setValue(os.cpu_count() or 1)
+        layout.addRow("Workers", self.workersInput)
+        self.memoryInput = self._spinBox(1, 2**20, 512)
+        layout.addRow("Memory per worker (MiB)", self.memoryInput)
+        self.float32CB = QtWidgets.QCheckBox("Float32")
+        layout.addRow(self.float32CB)
+        self.resumeCB = QtWidgets.QCheckBox("Resume previous run")
+        self.resumeCB.setChecked(True)
+        layout.addRow(self.resumeCB)
+
+        #Run
+        self.progressBar = QtWidgets.QProgressBar()
+        layout.addRow(self.progressBar)
+        self.runButton = QtWidgets.QPushButton("Run")
+        self.runButton.clicked.connect(self._run)
+        layout.addRow(self.runButton)
+        self.feedBackLabel = QtWidgets.QLabel()
+        self.feedBackLabel.setTextInteractionFlags(
+                                        QtCore.Qt.TextSelectableByMouse)
+        layout.addRow(self.feedBackLabel)
+
+    def _spinBox(self, minimum, maximum, value):
+        spinBox = QtWidgets.QDoubleSpinBox()
+        spinBox.setDecimals(3)
+        spinBox.setRange(minimum, maximum)
+        spinBox.setValue(value)
+        return spinBox
+
+    def _browseDirectory(self):
+        directory = QtWidgets.QFileDialog.getExistingDirectory(self)
+        if directory != "":
+            self.sourceInput.setText(directory)
+
+    def _browseManifest(self):
+        filename = QtWidgets.QFileDialog.getOpenFileName(self)
+        if filename[0] != "":
+            self.sourceInput.setText(filename[0])
+
+    def _browseOutput(self):
+        filename = QtWidgets.QFileDialog.getSaveFileName(self,
+                                            filter = "CSV-Files (*.csv)")
+        if filename[0] != "":
+            self.outputInput.setText(filename[0])
+
+    def _selectedFeatures(self):
+        items = [self.featuresList.item(i)
+                 for i in range(self.featuresList.count())]
+        return [item.text() for item in items
+                if item.checkState() == QtCore.Qt.Checked]
+
+    def _run(self):
+        features = self._selectedFeatures()
+        source = self.sourceInput.text()
+        output = self.outputInput.text()
+
+        if not features or source == "" or output == "":
+            QtWidgets.QMessageBox.warning(self, "Error",
+                        "You have to select a source, an output and at " +
+                        "least one(1) feature.", QtWidgets.QMessageBox.Ok)
+            return
+
+        try:
+            files = findFiles(source)
+        except IOError:
+            QtWidgets.QMessageBox.warning(self, "Error",
+                                          "Error opening the source",
+                                          QtWidgets.QMessageBox.Ok)
+            return
+
+        kargs = {"files"        : files,
+                 "features"     : features,
+                 "output"       : output,
+                 "windowSeconds": self.windowInput.value(),
+                 "stepSeconds"  : self.stepInput.value(),
+                 "sampleRate"   : self.sampleRateInput.value(),
+                 "workers"      : self.workersInput.value(),
+                 "memoryLimit"  : int(self.memoryInput.value() * 2**20),
+                 "resume"       : self.resumeCB.isChecked(),
+                 "dtype"        : np.float32 if self.float32CB.isChecked()
+                                  else np.float64}
+
+        self.worker = CohortWorker(kargs)
+        self.thread = QThread()
+        self.worker.moveToThread(self.thread)
+        self.thread.started.connect(self.worker.run)
+        self.worker.sigProgress.connect(self._setProgress)
+        self.worker.sigFinished.connect(self._finished)
+
+        self.runButton.setEnabled(False)
+        self.feedBackLabel.setText("Processing %d files..." % len(files))
+        self.thread.start()
+
+    def _setProgress(self, finished, total):
+        self.progressBar.setMaximum(total)
+        self.progressBar.setValue(finished)
+
+    def _finished(self, text):
+        self.thread.quit()
+        self.thread.wait()
+        self.feedBackLabel.setText(text)
+        self.runButton.setEnabled(True)
+
+    def closeEvent(self, event):
+        if hasattr(self, "thread") and self.thread.isRunning():
+            event.ignore()
+        else:
+            super().closeEvent(event)
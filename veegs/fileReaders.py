@@ -0,0 +1,228 @@
+"""
+This module defines functions to read the header and blocks of samples of the
+files supported by VEEGS without loading the whole recording.
+"""
+
+import os
+
+import numpy as np
+
+from pyedflib import EdfReader
+
+supportedExtensions = (".csv", ".edf")
+
+
+def isSupported(path):
+    return os.path.splitext(path)[1].lower() in supportedExtensions
+
+
+def _csvHeader(path):
+    """
+    Returns the names of the columns, or None if the first row contains
+    values, and the number of rows used by the names.
+    """
+    with open(path) as file:
+        firstRow = file.readline().strip().split(",")
+    try:
+        list(map(float, firstRow))
+        return None, 0
+    except ValueError:
+        return firstRow, 1
+
+
+def readHeader(path, sampleRate=None):
+    """
+    Reads the number of samples, the sample rate and the channels names of a
+    file.
+
+    Parameters
+    ----------
+    path: str
+        The path to the EDF or CSV file.
+    sampleRate: numeric, optional
+        The sample rate of a CSV file. It is mandatory for CSV files, since
+        they don't store it, and ignored for EDF files, whose own frequency is
+        used.
+
+    Returns
+    -------
+    tuple(int, numeric, list of str)
+    """
+    if os.path.splitext(path)[1].lower() == ".edf":
+        reader = EdfReader(path)
+        try:
+            frequencies = reader.getSampleFrequencies()
+            sampleRate = frequencies[0]
+            if not all(frequencies == sampleRate):
+                raise ValueError("All channels must have the same " +
+                                 "frequency.")
+            nSamples = int(reader.getNSamples()[0])
+            names = reader.getSignalLabels()
+        finally:
+            reader.close()
+    else:
+        if not sampleRate:
+            raise ValueError("The sample rate of a CSV file must be given.")
+        names, headerRows = _csvHeader(path)
+        with open(path) as file:
+            nSamples = sum(1 for line in file if line.strip()) - headerRows
+            file.seek(0)
+            if names is None:
+                nColumns = len(file.readline().split(","))
+                names = [str(i) for i in range(nColumns)]
+
+    return nSamples, sampleRate, names
+
+
+def rowOffsets(path, positions):
+    """
+    Returns the byte offset of the row of each sample position of a CSV file,
+    reading the file once. Empty lines aren't samples, as in readHeader. The
+    offsets of an EDF file are None, since its samples are read directly.
+
+    Parameters
+    ----------
+    path: str
+        The path to the EDF or CSV file.
+    positions: list of int
+        The positions of the samples in increasing order.
+
+    Returns
+    -------
+    list of int or None
+    """
+    if os.path.splitext(path)[1].lower() == ".edf":
+        return [None] * len(positions)
+
+    _, headerRows = _csvHeader(path)
+    offsets = []
+    with open(path, "rb") as file:
+        offset = sum(len(file.readline()) for _ in range(headerRows))
+        position = 0
+        for line in iter(file.readline, b""):
+            if len(offsets) == len(positions):
+                break
+            if line.strip():
+                while (len(offsets) < len(positions) and
+                       positions[len(offsets)] == position):
+                    offsets.append(offset)
+                position += 1
+            offset += len(line)
+    #The positions past the end start at the end of the file
+    return offsets + [offset] * (len(positions) - len(offsets))
+
+
+def readChunk(path, start, stop, dtype=np.float64, offset=None):
+    """
+    Reads the samples between start and stop of every channel of a file. The
+    samples are returned with the given dtype.
+
+    Parameters
+    ----------
+    offset: int, optional
+        The byte offset of the row of start in a CSV file, as returned by
+        rowOffsets. Without it the file is read from the beginning.
+
+    Returns
+    -------
+    numpy.ndarray
+        The samples in the shape (nChannels, stop - start).
+    """
+    if os.path.splitext(path)[1].lower() == ".edf":
+        reader = EdfReader(path)
+        try:
+            data = np.array([reader.readSignal(i, start, stop - start)
+                             for i in range(reader.signals_in_file)])
+        finally:
+            reader.close()
+    else:
+        if offset is None:
+            offset = rowOffsets(path, [start])[0]
+        lines = []
+        with open(path, "rb") as file:
+            file.seek(offset)
+            for line in iter(file.readline, b""):
+                if len(lines) == stop - start:
+                    break
+                if line.strip():
+                    lines.append(line.decode())
+        data = np.loadtxt(lines, delimiter=",", ndmin=2,
+                          dtype=dtype).transpose()
+
+    return data.astype(dtype, copy=False)
+
+
+def readBlocks(path, blockSamples, firstBlock=None, dtype=np.float64):
+    """
+    Reads every channel of a file in consecutive blocks of samples. It is a
+    generator, so the caller can show the first blocks or stop reading before
+    the whole file has been read.
+
+    Parameters
+    ----------
+    path: str
+        The path to the EDF or CSV file.
+    blockSamples: int
+        The number of samples of each block.
+    firstBlock: int, optional
+        The number of samples of the first block, for example a few seconds
+        to show a preview as soon as possible. By default blockSamples.
+    dtype: numpy.dtype
+        The type of the samples of the blocks.
+
+    Yields
+    ------
+    tuple(int, numpy.ndarray, int, int)
+        The position of the first sample of the block, the block in the shape
+        (nChannels, samples), the bytes read so far and the size of the file.
+    """
+    size = os.path.getsize(path)
+    sizes = _blockSizes(blockSamples, firstBlock)
+
+    if os.path.splitext(path)[1].lower() == ".edf":
+        reader = EdfReader(path)
+        try:
+            nSamples = int(reader.getNSamples()[0])
+            start = 0
+            while start < nSamples:
+                stop = min(start + next(sizes), nSamples)
+                #Each channel is converted as it is read, so only one channel
+                #is held in float64
+                block = np.empty((reader.signals_in_file, stop - start),
+                                 dtype=dtype)
+                for i in range(reader.signals_in_file):
+                    block[i] = reader.readSignal(i, start, stop - start)
+                #The samples are stored one after the other, so the bytes read
+                #are proportional to the samples
+                yield start, block, size * stop // nSamples, size
+                start = stop
+        finally:
+            reader.close()
+    else:
+        _, headerRows = _csvHeader(path)
+        with open(path, "rb") as file:
+            bytesRead = sum(len(file.readline()) for _ in range(headerRows))
+            start = 0
+            lines = []
+            blockSize = next(sizes)
+            for line in iter(file.readline, b""):
+                bytesRead += len(line)
+                if line.strip():
+                    lines.append(line.decode())
+                if len(lines) == blockSize:
+                    block = np.loadtxt(lines, delimiter=",", ndmin=2,
+                                       dtype=dtype).transpose()
+                    yield start, block, bytesRead, size
+                    start += len(lines)
+                    lines = []
+                    blockSize = next(sizes)
+            if lines:
+                block = np.loadtxt(lines, delimiter=",", ndmin=2,
+                                   dtype=dtype).transpose()
+                yield start, block, bytesRead, size
+
+
+def _blockSizes(blockSamples, firstBlock):
+    yield firstBlock or blockSamples
+    while True:
+        yield blockSamples
@@ -0,0 +1,194 @@
+"""
+This module defines the preprocessing applied to the recording before it is
+plotted. The samples are filtered in blocks as the playback advances, keeping
+the state of the filters between blocks, and the results are kept so playing
+a segment again doesn't filter it again.
+"""
+
+import numpy as np
+
+from scipy import signal
+
+
+class FilterPipeline():
+    """
+    This class applies a band-pass filter, a notch filter and a re-reference,
+    in that order, to the samples of a recording. Every stage is optional and
+    they can be changed at any moment.
+    """
+    order = 4
+    notchQuality = 30
+
+    def __init__(self, raw, sampleRate):
+        """
+        Parameters
+        ----------
+        raw: 2D numpy.ndarray
+            The recording in the shape (nChannels, nSamples).
+        sampleRate: numeric
+            The sample rate of the recording.
+        """
+        self.raw = raw
+        self.sampleRate = sampleRate
+
+        self.bandPass  = None
+        self.notch     = None
+        self.reference = None
+        self.sos = None
+
+        self.buffer   = None
+        self.external = False
+        self._reset()
+
+    @property
+    def active(self):
+        return (self.sos is not None or self.reference is not None)
+
+    @property
+    def data(self):
+        """
+        The array that must be read to get the preprocessed samples.
+        """
+        if self.buffer is not None:
+            return self.buffer
+        return self.raw
+
+    def setRaw(self, raw):
+        """
+        Sets the array with the raw samples, for example after moving them to
+        a shared memory block. It must contain the same samples.
+        """
+        self.raw = raw
+
+    def setBuffer(self, buffer):
+        """
+        Sets the array where the preprocessed samples are written, for example
+        a shared memory block. It must contain a copy of the raw samples. If
+        None, an own array is used when any stage is active.
+        """
+        self.buffer = buffer
+        self.external = buffer is not None
+        if buffer is None and self.active:
+            self.buffer = self.raw.copy()
+        self._reset()
+
+    def validate(self, bandPass=None, notch=None, reference=None):
+        """
+        Raises a ValueError if the stages can't be applied to the recording,
+        for example a cutoff frequency above the Nyquist frequency.
+        """
+        nyquist = self.sampleRate / 2
+        if bandPass:
+            low, high = bandPass
+            if not 0 < low < high < nyquist:
+                raise ValueError("The band-pass frequencies must be between 0 "
+                                 "and %g Hz, the Nyquist frequency of the "
+                                 "recording, and the low one must be lower "
+                                 "than the high one." % nyquist)
+        if notch and not 0 < notch < nyquist:
+            raise ValueError("The notch frequency (%g Hz) must be lower than "
+                             "%g Hz, the Nyquist frequency of the recording."
+                             % (notch, nyquist))
+        if reference not in (None, "average"):
+            nChannels = self.raw.shape[0]
+            if not reference or not all(0 <= i < nChannels
+                                        for i in reference):
+                raise ValueError("The reference channels aren't channels of "
+                                 "the recording.")
+
+    def configure(self, bandPass=None, notch=None, reference=None):
+        """
+        Sets the stages of the pipeline.
+
+        Parameters
+        ----------
+        bandPass: tuple(float, float), optional
+            The low and high cutoff frequencies.
+        notch: float, optional
+            The frequency to remove, usually 50 or 60 Hz.
+        reference: "average" or list of int, optional
+            The reference subtracted from every channel: the average of all
+            the channels or the average of the given channels.
+
+        Raises
+        ------
+        ValueError
+            If the stages can't be applied to the recording. The pipeline
+            isn't changed.
+        """
+        self.validate(bandPass, notch, reference)
+        self.bandPass  = bandPass
+        self.notch     = notch
+        self.reference = reference
+
+        sections = []
+        if bandPass:
+            sections.append(signal.butter(self.order, bandPass, "bandpass",
+                                          fs=self.sampleRate, output="sos"))
+        if notch:
+            b, a = signal.iirnotch(notch, self.notchQuality, fs=self.sampleRate)
+            sections.append(signal.tf2sos(b, a))
+        self.sos = np.vstack(sections) if sections else None
+
+        #The samples that aren't preprocessed yet are the raw ones, never the
+        #ones of the previous stages
+        if self.active and self.buffer is None:
+            self.buffer = self.raw.copy()
+        elif self.buffer is not None:
+            if self.external or self.active:
+                self.buffer[:] = self.raw
+            else:
+                self.buffer = None
+
+        self._reset()
+
+    def _reset(self):
+        #The samples in [validFrom, filled) are already preprocessed
+        self.validFrom = self.filled = 0
+        self.zi = None
+
+    def _warmUp(self):
+        """
+        Returns the number of samples filtered before a position when the
+        filtering starts there, so the transient of the filters has passed.
+        """
+        seconds = 3/self.bandPass[0] if self.bandPass else 1
+        return int(seconds * self.sampleRate)
+
+    def ensure(self, start, end):
+        """
+        Preprocesses the samples needed to read [start, end). Only the samples
+        that weren't preprocessed before are filtered.
+        """
+        if not self.active:
+            return
+
+        end = min(end, self.raw.shape[1])
+        if self.validFrom <= start and end <= self.filled:
+            return
+
+        #Far from the preprocessed samples the filters start again
+        if (start < self.validFrom or start > self.filled + self._warmUp() or
+            self.filled == self.validFrom):
+            self.validFrom = self.filled = max(0, start - self._warmUp())
+            self.zi = None
+
+        self._process(self.filled, end)
+        self.filled = end
+
+    def _process(self, start, end):
+        y = self.raw[:, start:end]
+
+        if self.sos is not None:
+            if self.zi is None:
+                #Steady state for the first sample to avoid a step
+                self.zi = (signal.sosfilt_zi(self.sos)[:, None, :] *
+                           y[None, :, 0, None])
+            y, self.zi = signal.sosfilt(self.sos, y, zi=self.zi)
+
+        if self.reference == "average":
+            y = y - y.mean(axis=0)
+        elif self.reference is not None:
+            y = y - y[self.reference].mean(axis=0)
+
+        self.buffer[:, start:end] = y
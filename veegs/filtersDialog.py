@@ -0,0 +1,112 @@
+from PyQt5 import QtCore, QtWidgets
+
+
+class FiltersDialog(QtWidgets.QDialog):
+    """
+    This is a dialog for setting the preprocessing of the signals. The changes
+    are applied without stopping the playback.
+    """
+    notchOptions = {"Off": None, "50 Hz": 50, "60 Hz": 60}
+    referenceOptions = ["None", "Common Average", "Custom"]
+
+    def __init__(self, parent, names, settings):
+        super().__init__(parent)
+        self.setWindowTitle("Filters")
+        self.setAttribute(QtCore.Qt.WA_DeleteOnClose)
+        self.setModal(False)
+
+        self.names = names
+
+        layout = QtWidgets.QFormLayout()
+        self.setLayout(layout)
+
+        #Band-pass
+        self.bandPassCB = QtWidgets.QCheckBox("Band-pass")
+        layout.addRow(self.bandPassCB)
+        self.lowInput  = self._spinBox(0.01, 1)
+        self.highInput = self._spinBox(0.1, 40)
+        layout.addRow("Low (Hz)",  self.lowInput)
+        layout.addRow("High (Hz)", self.highInput)
+
+        #Notch
+        self.notchCombo = QtWidgets.QComboBox()
+        self.notchCombo.addItems(list(self.notchOptions))
+        layout.addRow("Notch", self.notchCombo)
+
+        #Reference
+        self.referenceCombo = QtWidgets.QComboBox()
+        self.referenceCombo.addItems(self.referenceOptions)
+        layout.addRow("Reference", self.referenceCombo)
+        self.customInput = QtWidgets.QLineEdit()
+        self.customInput.setPlaceholderText("Channels separated by commas")
+        layout.addRow("Custom reference", self.customInput)
+
+        self._setSettings(settings)
+
+        buttonBox = QtWidgets.QDialogButtonBox(QtWidgets.QDialogButtonBox.Apply|
+                                             QtWidgets.QDialogButtonBox.Close)
+        layout.addRow(buttonBox)
+        buttonBox.button(QtWidgets.QDialogButtonBox.Apply).clicked.connect(
+                                                                   self._apply)
+        buttonBox.rejected.connect(self.reject)
+
+    def _spinBox(self, minimum, value):
+        spinBox = QtWidgets.QDoubleSpinBox()
+        spinBox.setDecimals(2)
+        spinBox.setRange(minimum, self.parent().helper.sampleRate/2 - 0.01)
+        spinBox.setValue(value)
+        return spinBox
+
+    def _setSettings(self, settings):
+        bandPass = settings.get("bandPass")
+        self.bandPassCB.setChecked(bandPass is not None)
+        if bandPass:
+            self.lowInput.setValue(bandPass[0])
+            self.highInput.setValue(bandPass[1])
+
+        for text, value in self.notchOptions.items():
+            if value == settings.get("notch"):
+                self.notchCombo.setCurrentText(text)
+
+        reference = settings.get("reference")
+        if reference == "average":
+            self.referenceCombo.setCurrentIndex(1)
+        elif reference is not None:
+            self.referenceCombo.setCurrentIndex(2)
+            self.customInput.setText(",".join(self.names[i]
+                                              for i in reference))
+
+    def getSettings(self):
+        """
+        Returns the settings in the format of FilterPipeline.configure.
+        """
+        bandPass = None
+        if self.bandPassCB.isChecked():
+            bandPass = (self.lowInput.value(), self.highInput.value())
+
+        reference = None
+        if self.referenceCombo.currentIndex() == 1:
+            reference = "average"
+        elif self.referenceCombo.currentIndex() == 2:
+            channels = [name.strip() for name in
+                        self.customInput.text().split(",") if name.strip()]
+            reference = [self.names.index(name) for name in channels]
+
+        return {"bandPass" : bandPass,
+                "notch"    : self.notchOptions[self.notchCombo.currentText()],
+                "reference": reference}
+
+    def _apply(self):
+        try:
+            settings = self.getSettings()
+            if settings["bandPass"] and not (settings["bandPass"][0] <
+                                             settings["bandPass"][1]):
+                raise ValueError("The low frequency must be lower than the " +
+                                 "high one.")
+            if settings["reference"] == []:
+                raise ValueError("You have to select at least one(1) " +
+                                 "channel for the reference.")
+            self.parent().setFilters(settings)
+        except ValueError as e:
+            QtWidgets.QMessageBox.warning(self, "Error", str(e),
+                                          QtWidgets.QMessageBox.Ok)
@@ -0,0 +1,265 @@
+"""
+This module defines a history of features with several resolutions. Recent
+values are kept as they are and older values are kept aggregated in buckets,
+so the memory used doesn't grow with the duration of the session.
+
+The values of the last window positions are also cached by their position,
+so seeking doesn't compute again the windows already computed.
+"""
+
+import collections
+
+import numpy as np
+
+
+class _Tier():
+    """
+    This is a bounded buffer of aggregated values sorted by time. It stores up
+    to capacity entries; when it is full the oldest entry is dropped.
+    """
+    def __init__(self, capacity, nColumns, aggregated=True):
+        self.capacity = capacity
+
+        #Twice the capacity so the data is moved only once every capacity
+        #appends and it is always contiguous
+        self.time = np.empty(2*capacity)
+        self.mean = np.empty((2*capacity, nColumns))
+        if aggregated:
+            self.min = np.empty((2*capacity, nColumns))
+            self.max = np.empty((2*capacity, nColumns))
+        else:
+            self.min = self.max = self.mean
+        self.aggregated = aggregated
+
+        self.lo = self.hi = 0
+        #True once the oldest entries have been dropped
+        self.dropped = False
+
+    def __len__(self):
+        return self.hi - self.lo
+
+    def append(self, time, mean, minimum, maximum):
+        if self.hi == len(self.time):
+            keep = slice(self.hi - self.capacity + 1, self.hi)
+            n = self.capacity - 1
+            self.time[:n] = self.time[keep]
+            self.mean[:n] = self.mean[keep]
+            if self.aggregated:
+                self.min[:n] = self.min[keep]
+                self.max[:n] = self.max[keep]
+            self.lo, self.hi = 0, n
+
+        self.time[self.hi] = time
+        self.mean[self.hi] = mean
+        if self.aggregated:
+            self.min[self.hi] = minimum
+            self.max[self.hi] = maximum
+        self.hi += 1
+        if len(self) > self.capacity:
+            self.lo += 1
+            self.dropped = True
+
+    def covers(self, time):
+        return len(self) > 0 and (not self.dropped or
+                                  self.time[self.lo] <= time)
+
+    def span(self, start, end):
+        """
+        Returns the slice of the entries between start and end, including the
+        previous and the next ones so the curves reach the borders.
+        """
+        times = self.time[self.lo:self.hi]
+        i0 = max(np.searchsorted(times, start, "left") - 1, 0)
+        i1 = min(np.searchsorted(times, end, "right") + 1, len(times))
+        return slice(self.lo + i0, self.lo + i1)
+
+    def truncate(self, time):
+        """
+        Removes the entries from time onwards.
+        """
+        self.hi = self.lo + np.searchsorted(self.time[self.lo:self.hi], time,
+                                            "left")
+
+
+class _Bucket():
+    """
+    Accumulates entries of a tier until they are aggregated in the next one.
+    """
+    def __init__(self):
+        self.clear()
+
+    def clear(self):
+        self.count = 0
+
+    def add(self, time, mean, minimum, maximum):
+        if self.count == 0:
+            self.time = time
+            self.sum  = np.array(mean, dtype=float)
+            self.min  = np.array(minimum, dtype=float)
+            self.max  = np.array(maximum, dtype=float)
+        else:
+            self.time += time
+            self.sum  += mean
+            np.minimum(self.min, minimum, out=self.min)
+            np.maximum(self.max, maximum, out=self.max)
+        self.count += 1
+
+    def get(self):
+        return (self.time/self.count, self.sum/self.count, self.min,
+                self.max)
+
+
+class FeatureHistory():
+    """
+    This class stores the values of a set of features along the time. The
+    first tier keeps the last values at full resolution, and each of the next
+    ones aggregates the previous one in buckets of factor entries, keeping
+    their mean, minimum and maximum. Every tier has the same capacity, so the
+    memory is bounded and the coarser tiers reach further into the past.
+    """
+    def __init__(self, capacity=4096, factor=8, levels=5):
+        self.capacity = capacity
+        self.factor   = factor
+        self.levels   = levels
+        self.clear()
+
+    def clear(self):
+        self.columns = None
+        self.tiers   = []
+        self.buckets = []
+
+    def _init(self, names):
+        self.columns = {name: i for i, name in enumerate(names)}
+        nColumns = len(self.columns)
+        self.tiers = [_Tier(self.capacity, nColumns, aggregated = level > 0)
+                      for level in range(self.levels)]
+        self.buckets = [_Bucket() for _ in range(self.levels - 1)]
+
+    def __len__(self):
+        return len(self.tiers[0]) if self.tiers else 0
+
+    def append(self, time, features):
+        """
+        Adds the values of the features at a time. The features must be a
+        pandas.Series or a dict, whose keys are used as the names of the
+        columns the first time.
+        """
+        if self.columns is None:
+            self._init(list(features.keys()))
+
+        values = np.array([features[name] for name in self.columns],
+                          dtype=float)
+        entry = (time, values, values, values)
+        self.tiers[0].append(*entry)
+
+        #Every full bucket becomes an entry of the next tier
+        for bucket, tier in zip(self.buckets, self.tiers[1:]):
+            bucket.add(*entry)
+            if bucket.count < self.factor:
+                break
+            entry = bucket.get()
+            bucket.clear()
+            tier.append(*entry)
+
+    def truncate(self, time):
+        """
+        Removes the values from time onwards, for example after going back in
+        the recording.
+        """
+        for tier in self.tiers:
+            tier.truncate(time)
+        for bucket in self.buckets:
+            bucket.clear()
+
+    def query(self, start, end, pixels):
+        """
+        Returns the values between start and end from the finest tier that
+        covers start and has at most two entries per pixel.
+
+        Returns
+        -------
+        tuple(time, mean, min, max, aggregated)
+            The time is a 1D array and the values 2D arrays with a column for
+            each feature. aggregated is False if the values are at full
+            resolution.
+        """
+        if not self.tiers:
+            empty = np.empty((0, 0))
+            return np.empty(0), empty, empty, empty, False
+
+        level = len(self.tiers) - 1
+        for i, tier in enumerate(self.tiers):
+            span = tier.span(start, end)
+            if tier.covers(start) and span.stop - span.start <= 2*pixels:
+                level = i
+                break
+
+        #The newest values aren't aggregated yet, so they are taken from the
+        #finer tiers
+        parts = []
+        last = -np.inf
+        for tier in reversed(self.tiers[:level+1]):
+            span  = tier.span(start, end)
+            first = tier.lo + np.searchsorted(tier.time[tier.lo:tier.hi],
+                                              last, "right")
+            span  = slice(max(span.start, first), span.stop)
+            if span.stop > span.start:
+                parts.append((tier, span))
+                last = tier.time[span.stop - 1]
+
+        if not parts:
+            parts = [(self.tiers[0], slice(0, 0))]
+
+        return (np.concatenate([t.time[s] for t, s in parts]),
+                np.concatenate([t.mean[s] for t, s in parts]),
+                np.concatenate([t.min[s]  for t, s in parts]),
+                np.concatenate([t.max[s]  for t, s in parts]),
+                self.tiers[level].aggregated)
+
+
+class FeatureCache():
+    """
+    This class keeps the values of the features of the last window positions
+    computed. At most capacity positions are kept; when it is full the least
+    recently used one is dropped. The values are stored as arrays in the order
+    of the names of the first features stored.
+    """
+    def __init__(self, capacity=4096):
+        self.capacity = capacity
+        self.clear()
+
+    def clear(self):
+        self.names   = None
+        self.entries = collections.OrderedDict()
+
+    def __len__(self):
+        return len(self.entries)
+
+    def get(self, position):
+        """
+        Returns the features of a position as a dict, or None if the position
+        isn't cached.
+        """
+        values = self.entries.get(position)
+        if values is None:
+            return None
+        self.entries.move_to_end(position)
+        return dict(zip(self.names, values))
+
+    def put(self, position, features):
+        if self.names is None:
+            self.names = list(features.keys())
+        self.entries[position] = np.array([features[name]
+                                           for name in self.names],
+                                          dtype=float)
+        self.entries.move_to_end(position)
+        if len(self.entries) > self.capacity:
+            self.entries.popitem(last=False)
+
+    def between(self, start, stop):
+        """
+        Returns the cached positions between start and stop, both excluded,
+        in increasing order.
+        """
+        return sorted(position for position in self.entries
+                      if start < position < stop)
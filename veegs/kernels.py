@@ -0,0 +1,295 @@
+"""
+This module defines compiled versions of the one channel complexity features,
+computed over all the channels of a window in a single call. The kernels are
+compiled with Numba the first time they are used and cached on disk, so the
+next sessions start with them already compiled. If Numba isn't available the
+features of eeglib are applied to each channel instead.
+
+Every function receives a window in the shape (nChannels, nSamples), or a
+single channel, and returns the value of each channel with the same defaults
+as eeglib.
+"""
+
+import numpy as np
+
+from eeglib import features
+
+try:
+    from numba import config, njit, prange
+    available = True
+except ImportError:
+    available = False
+
+
+def _apply(kernel, fallback, data, *args):
+    """
+    Applies the kernel to the channels of data, or fallback to each channel
+    if the kernels aren't available.
+    """
+    data = np.asarray(data, dtype=float)
+    if not available:
+        if data.ndim == 1:
+            return fallback(data)
+        return np.array([fallback(channel) for channel in data])
+
+    if data.ndim == 1:
+        return kernel(data[None], *args)[0]
+    return kernel(data, *args)
+
+
+def _jit(parallel=True):
+    def decorator(function):
+        if not available:
+            return function
+        #With a single thread the parallel loops only add overhead
+        return njit(parallel = parallel and config.NUMBA_NUM_THREADS > 1,
+                    cache = True)(function)
+    return decorator
+
+
+@_jit(parallel=False)
+def _slope(x, y):
+    """
+    Returns the slope of the least squares line of y over x.
+    """
+    xMean = x.mean()
+    yMean = y.mean()
+    return (((x - xMean) * (y - yMean)).sum() /
+            ((x - xMean) * (x - xMean)).sum())
+
+
+@_jit()
+def _PFD(data):
+    nChannels, size = data.shape
+    result = np.empty(nChannels)
+    logSize = np.log(size)
+    for c in prange(nChannels):
+        y = data[c]
+        signChanges = 0
+        for i in range(2, size):
+            if (y[i] - y[i-1]) * (y[i-1] - y[i-2]) < 0:
+                signChanges += 1
+        result[c] = logSize / (logSize +
+                               np.log(size / (size + 0.4 * signChanges)))
+    return result
+
+
+@_jit()
+def _HFD(data, kMax):
+    nChannels, N = data.shape
+    result = np.empty(nChannels)
+    x = -np.log(np.arange(2, kMax + 1).astype(np.float64))
+    for c in prange(nChannels):
+        y = data[c]
+        L = np.empty(kMax - 1)
+        for k in range(2, kMax + 1):
+            total = 0.0
+            for m in range(k):
+                Lmk = 0.0
+                for i in range(1, (N - m) // k):
+                    Lmk += abs(y[m + i*k] - y[m + i*k - k])
+                total += Lmk * (N - 1) / (((N - m) // k) * k * k)
+            mean = total / k
+            L[k-2] = np.log(0.01/k if mean == 0 else mean)
+        if kMax == 2:
+            #With a single point eeglib returns the least squares solution
+            #of minimum norm of the line with intercept
+            result[c] = x[0] * L[0] / (x[0] * x[0] + 1)
+        else:
+            result[c] = _slope(x, L)
+    return result
+
+
+@_jit(parallel=False)
+def _find(sequence, q0, qSize, start):
+    """
+    Returns where the sequence[q0:q0+qSize] starts in sequence from start,
+    relative to start, or -1 if it isn't found before q0.
+    """
+    for i in range(start, q0):
+        equal = True
+        for j in range(qSize):
+            if sequence[q0 + j] != sequence[i + j]:
+                equal = False
+                break
+        if equal:
+            return i - start
+    return -1
+
+
+@_jit()
+def _LZC(data):
+    nChannels, n = data.shape
+    result = np.empty(nChannels)
+    for c in prange(nChannels):
+        x = data[c]
+        sequence = (x > np.median(x)).astype(np.uint8)
+
+        #LZ76 exactly as eeglib computes it, where is relative to sqi
+        complexity = 1
+        q0 = qSize = 1
+        sqi = where = 0
+        while q0 + qSize <= n:
+            if sqi != q0 - 1:
+                where = _find(sequence, q0, qSize, sqi)
+                contained = where >= 0
+            else:
+                contained = (q0 + qSize < n and
+                             sequence[q0 + qSize] == sequence[q0 + qSize - 1])
+
+            if contained:
+                qSize += 1
+                sqi = where
+            else:
+                q0 += qSize
+                qSize = 1
+                complexity += 1
+                sqi = 0
+
+        result[c] = complexity / (n / np.log2(n))
+    return result
+
+
+@_jit()
+def _DFA(data, ns):
+    nChannels, size = data.shape
+    result = np.empty(nChannels)
+    logNs = np.log(ns.astype(np.float64))
+    for c in prange(nChannels):
+        Y = np.cumsum(data[c] - data[c].mean())
+        F = np.empty(len(ns))
+        for f in range(len(ns)):
+            n = ns[f]
+            nWindows = -(-(size - n + 1) // n)
+            #The linear trend of each window is removed with least squares
+            xMean = (n - 1) / 2
+            xVar  = 0.0
+            for i in range(n):
+                xVar += (i - xMean) * (i - xMean)
+            fluctuation = 0.0
+            for w in range(nWindows):
+                y = Y[w*n:w*n + n]
+                yMean = y.mean()
+                cov = 0.0
+                for i in range(n):
+                    cov += (i - xMean) * (y[i] - yMean)
+                slope = cov / xVar
+                squares = 0.0
+                for i in range(n):
+                    residual = y[i] - yMean - slope * (i - xMean)
+                    squares += residual * residual
+                fluctuation += np.sqrt(squares / n)
+            F[f] = np.log(fluctuation / nWindows)
+        if len(ns) == 1:
+            #With a single window size eeglib returns the solution of minimum
+            #norm of numpy.polyfit, that scales the columns first
+            alpha = F[0] / (2 * abs(logNs[0]))
+        else:
+            alpha = _slope(logNs, F)
+        result[c] = 0.0 if np.isnan(alpha) else alpha
+    return result
+
+
+@_jit()
+def _sampEn(data, m, l, fr, eps):
+    nChannels, N = data.shape
+    result = np.empty(nChannels)
+    for c in prange(nChannels):
+        x = data[c]
+        r = fr * x.std()
+        sizeB = N - (m - 1) * l
+        sizeA = N - m * l
+        #The vectors of size m+1 are the vectors of size m plus one element,
+        #so both counts are done in the same pass
+        A = B = 0
+        for i in range(sizeB):
+            for j in range(i + 1, sizeB):
+                distance = 0.0
+                for k in range(m):
+                    distance = max(distance, abs(x[i + k*l] - x[j + k*l]))
+                    if distance > r:
+                        break
+                if distance <= r:
+                    B += 2
+                    if (j < sizeA and
+                        abs(x[i + m*l] - x[j + m*l]) <= r):
+                        A += 2
+        result[c] = -np.log((A + eps) / (B + eps))
+    return result
+
+
+def PFD(data):
+    """
+    Petrosian Fractal Dimension.
+    """
+    return _apply(_PFD, features.PFD, data)
+
+
+def HFD(data, kMax=None):
+    """
+    Higuchi Fractal Dimension. By default kMax is nSamples//4, so it needs at
+    least 8 samples.
+    """
+    kMax = np.shape(data)[-1] // 4 if kMax is None else kMax
+    return _apply(_HFD, lambda x: features.HFD(x, kMax), data, kMax)
+
+
+def _eeglibLZC(x):
+    """
+    The LZC of eeglib. It reads one element past the end of the sequence when
+    the last component reaches it, so the sequence is padded with a value
+    that doesn't match, and that component is counted as the kernel does.
+    """
+    n = len(x)
+    padded = np.empty(n + 1, dtype=np.uint8)
+    padded[:n] = x > np.median(x)
+    padded[n] = 2
+    return features._LZC(padded[:n]) / (n / np.log2(n))
+
+
+def LZC(data):
+    """
+    Lempel-Ziv Complexity using the median of each channel as threshold.
+    """
+    return _apply(_LZC, _eeglibLZC, data)
+
+
+def DFA(data):
+    """
+    Detrended Fluctuation Analysis with linear trends and windows from 4 to
+    nSamples//4 samples. With less than 16 samples the windows are shorter
+    than 4 samples and the result, like the one of eeglib, is rounding noise.
+    """
+    size = np.shape(data)[-1]
+    ns = np.unique(np.geomspace(4, size//4, int(np.round(np.log2(size))),
+                                dtype=int))
+    return _apply(_DFA, features.DFA, data, ns)
+
+
+def sampEn(data, m=2, l=1, fr=0.2, eps=1e-10):
+    """
+    Sample Entropy with a tolerance of fr times the standard deviation.
+    """
+    return _apply(_sampEn,
+                  lambda x: features.sampEn(x, m, l, None, fr, eps),
+                  data, m, l, fr, eps)
+
+
+#Features by the names used in the plots. "MSE" is the key of the Sample
+#Entropy checkbox, and it is computed as EEG.sampEn, since the EEG of eeglib
+#has no multiscale entropy
+batchedFeatures = {"PFD": PFD,
+                   "HFD": HFD,
+                   "LZC": LZC,
+                   "DFA": DFA,
+                   "MSE": sampEn}
+
+
+def warmUp():
+    """
+    Compiles the kernels, or loads them from the cache, so the first window
+    isn't delayed by the compilation.
+    """
+    window = np.random.default_rng(0).standard_normal((2, 64))
+    for function in batchedFeatures.values():
+        function(window)
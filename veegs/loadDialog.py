@@ -0,0 +1,224 @@
+import os
+
+import numpy as np
+import pyqtgraph as pg
+from PyQt5 import QtWidgets
+from PyQt5.QtCore import QObject, QThread, pyqtSlot, pyqtSignal
+
+from eeglib.helpers import Helper
+
+from .fileReaders import readHeader, readBlocks
+from .channelSelector import ChannelSelectorDialog
+from . import kernels
+
+
+class FileLoader(QObject):
+    """
+    This class reads a file in a separated thread so the GUI doesn't freeze.
+    The header and the first seconds are emitted as soon as they are read.
+    """
+    sigHeader   = pyqtSignal(int, float, list)
+    sigPreview  = pyqtSignal(object)
+    sigProgress = pyqtSignal("qint64", "qint64")
+    sigFinished = pyqtSignal(object)
+    sigFailed   = pyqtSignal(object)
+    sigCancelled = pyqtSignal()
+
+    blockSeconds   = 60
+    previewSeconds = 5
+
+    def __init__(self, path, sampleRate=None, ICA=False, normalize=False,
+                 dtype=np.float64):
+        super().__init__()
+        self.path = path
+        self.sampleRate = sampleRate
+        self.ICA = ICA
+        self.normalize = normalize
+        self.dtype = dtype
+        self.cancelled = False
+
+    def cancel(self):
+        """
+        Stops the reading after the current block. It must be called
+        directly, since the thread doesn't process events while reading.
+        """
+        self.cancelled = True
+
+    @pyqtSlot()
+    def run(self):
+        try:
+            nSamples, sampleRate, names = readHeader(self.path, self.sampleRate)
+            names = list(names)
+            self.sigHeader.emit(nSamples, sampleRate, names)
+
+            #The samples are stored in the final precision as they are read,
+            #so the whole recording is never held in float64
+            data = np.empty((len(names), nSamples), dtype=self.dtype)
+            blocks = readBlocks(self.path,
+                                int(self.blockSeconds   * sampleRate),
+                                int(self.previewSeconds * sampleRate),
+                                self.dtype)
+            for start, block, bytesRead, size in blocks:
+                if self.cancelled:
+                    blocks.close()
+                    self.sigCancelled.emit()
+                    return
+                data[:, start:start + block.shape[1]] = block
+                if start == 0:
+                    self.sigPreview.emit(block)
+                self.sigProgress.emit(bytesRead, size)
+
+            #The kernels are compiled while the file is being loaded
+            kernels.warmUp()
+
+            helper = Helper(data, sampleRate=sampleRate, names=names,
+                            ICA=self.ICA, normalize=self.normalize)
+            if self.cancelled:
+                self.sigCancelled.emit()
+            else:
+                self.sigFinished.emit(helper)
+        except Exception as e:
+            self.sigFailed.emit(e)
+
+
+class LoadDialog(QtWidgets.QDialog):
+    """
+    This is a dialog that shows the progress of the loading of a file and a
+    preview of its first seconds. The channels can be selected while the rest
+    of the file is being read.
+    """
+    maxPreviewChannels = 16
+
+    def __init__(self, path, parent=None, sampleRate=None, ICA=False,
+                 normalize=False, dtype=np.float64):
+        super().__init__(parent)
+        self.setWindowTitle("Opening " + os.path.basename(path))
+
+        self.helper   = None
+        self.channels = None
+        self.error    = None
+        self.names    = None
+        self.preview  = None
+        self.selected  = False
+        self.selecting = False
+
+        layout = QtWidgets.QVBoxLayout()
+        self.setLayout(layout)
+
+        self.infoLabel = QtWidgets.QLabel("Reading the header...")
+        layout.addWidget(self.infoLabel)
+
+        self.progressBar = QtWidgets.QProgressBar()
+        self.progressBar.setRange(0, 1000)
+        layout.addWidget(self.progressBar)
+
+        self.previewPlot = pg.PlotWidget()
+        self.previewPlot.getPlotItem().hideAxis("left")
+        layout.addWidget(self.previewPlot)
+
+        buttonBox = QtWidgets.QDialogButtonBox(QtWidgets.QDialogButtonBox.Cancel)
+        self.channelsButton = buttonBox.addButton("Select Channels...",
+                                       QtWidgets.QDialogButtonBox.ActionRole)
+        self.channelsButton.setEnabled(False)
+        self.channelsButton.clicked.connect(self._selectChannels)
+        buttonBox.rejected.connect(self.reject)
+        layout.addWidget(buttonBox)
+        self.cancelButton = buttonBox.button(QtWidgets.QDialogButtonBox.Cancel)
+
+        #Loader thread
+        self.loader = FileLoader(path, sampleRate, ICA, normalize, dtype)
+        self.loader.sigHeader  .connect(self._setHeader)
+        self.loader.sigPreview .connect(self._setPreview)
+        self.loader.sigProgress.connect(self._setProgress)
+        self.loader.sigFinished.connect(self._finish)
+        self.loader.sigFailed  .connect(self._fail)
+        self.loader.sigCancelled.connect(self._cancelled)
+
+        self.loaderThread = QThread()
+        self.loader.moveToThread(self.loaderThread)
+        self.loaderThread.started.connect(self.loader.run)
+        self.loaderThread.start()
+
+    def _setHeader(self, nSamples, sampleRate, names):
+        self.names = names
+        self.infoLabel.setText("%d channels, %d samples at %g Hz" %
+                               (len(names), nSamples, sampleRate))
+        self.sampleRate = sampleRate
+        self.channelsButton.setEnabled(True)
+
+    def _setPreview(self, block):
+        self.preview = block
+        self._drawPreview()
+
+    def _drawPreview(self):
+        if self.preview is None:
+            return
+        channels = self.channels if self.channels is not None else\
+                   range(len(self.preview))
+        channels = list(channels)[:self.maxPreviewChannels]
+
+        self.previewPlot.clear()
+        time = np.arange(self.preview.shape[1]) / self.sampleRate
+        #The channels are stacked, each one in a band of height 1
+        for i, channel in enumerate(channels):
+            y = self.preview[channel]
+            span = np.ptp(y) or 1
+            self.previewPlot.plot(time, i + (y - y.min())/span,
+                                  pen = pg.intColor(i))
+
+    def _setProgress(self, bytesRead, size):
+        self.progressBar.setValue(int(1000 * bytesRead / max(size, 1)))
+
+    def _finish(self, helper):
+        self._stopThread()
+        self.helper = helper
+        self.progressBar.setValue(1000)
+        self.infoLabel.setText(self.infoLabel.text() + " - Loaded")
+        self._tryAccept()
+
+    def _fail(self, error):
+        self._stopThread()
+        self.error = error
+        self._tryAccept()
+
+    def _cancelled(self):
+        self._stopThread()
+        super().reject()
+
+    def _stopThread(self):
+        self.loaderThread.quit()
+        self.loaderThread.wait()
+
+    def _selectChannels(self):
+        self.selecting = True
+        dialog = ChannelSelectorDialog(len(self.names), self.names, self)
+        if dialog.exec():
+            self.channels = dialog.getChannel()
+            self._drawPreview()
+        self.selecting = False
+        self.selected  = True
+        self._tryAccept()
+
+    def _tryAccept(self):
+        """
+        Closes the dialog once the file is loaded and the channels have been
+        selected.
+        """
+        if self.selecting:
+            return
+        if self.error is not None:
+            super().reject()
+        elif self.helper is not None:
+            if self.selected:
+                self.accept()
+            else:
+                self._selectChannels()
+
+    def reject(self):
+        #The dialog is closed when the loader stops
+        if self.loaderThread.isRunning():
+            self.loader.cancel()
+            self.cancelButton.setEnabled(False)
+            self.infoLabel.setText("Cancelling...")
+        else:
+            super().reject()
@@ -5,6 +5,7 @@
 from __future__ import unicode_literals
 import sys
 import os
+import time
 
 import numpy as np
 
@@ -12,14 +13,20 @@ import numpy as np
 from PyQt5 import QtCore, QtWidgets, QtGui, uic
 from PyQt5.QtCore import QThread, pyqtSlot, pyqtSignal, QSemaphore
 
-# eeglib imports
-from eeglib.helpers import CSVHelper, EDFHelper
-
 # veegs imports
 from .loopTrigger import LoopTrigger
 from .plots import PlotWindow
 from .options import OptionsDialog
-from .channelSelector import ChannelSelectorDialog
+from .loadDialog import LoadDialog
+from .cohortDialog import CohortDialog
+from .annotations import AnnotationIndex
+from .sharedData import SharedWorkerPool
+from .filters import FilterPipeline
+from .filtersDialog import FiltersDialog
+from .publisher import FeaturePublisher
+from .overviewWidget import OverviewWidget
+from . import plugins
+from .scheduler import UpdateScheduler
 
 # Name of the program to display
 progname = "VEEGS"
@@ -39,6 +46,9 @@ class ApplicationWindow(QtWidgets.QMainWindow):
         
         self.app= QtWidgets.QApplication.instance()
         self.state = "INIT"
+        
+        #The plugins are shown in the plot windows
+        plugins.discover()
 
         self.eegSettings = {}
 
@@ -46,14 +56,29 @@ class ApplicationWindow(QtWidgets.QMainWindow):
         self.__initBrowseButton()
         self.__initSetWindowSizeButton()
         self.__initRunInputs()
+        self.__initTimeline()
+        self.__initOverview()
         self.__initRunButtons()
         self.__initNewPlotAction()
         self.__initOptionsAction()
+        self.__initCohortAction()
+        self.__initFiltersAction()
 
         self.rtDelay = self.simDelay=1/8
 
-        self.functions=[]
         self.windowList = []
+        #Each plot window is updated at its own interval
+        self.scheduler = UpdateScheduler()
+        
+        self.featureProcesses = 0
+        self.workerPool = None
+        
+        self.filters = None
+        self.filterSettings = {}
+        
+        self.publisher = None
+        self.publisherAddress = ""
+        self.plotCount = 0
 
 
     def __setState(self, state):
@@ -91,18 +116,39 @@ class ApplicationWindow(QtWidgets.QMainWindow):
             samples  = int(np.round(self.simDelay * sampleRate))
             speedMul = self.simDelay/self.rtDelay
             
-            od=OptionsDialog(parent   = self,
-                             samples  = samples,
-                             speedMul = speedMul)
+            od=OptionsDialog(parent    = self,
+                             samples   = samples,
+                             speedMul  = speedMul,
+                             processes = self.featureProcesses,
+                             address   = self.publisherAddress)
             od.show()
             
         self.actionOptions.triggered.connect(openOptionsDialog)
 
+    def __initCohortAction(self):
+        def openCohortDialog():
+            cd = CohortDialog(parent = self)
+            cd.show()
+        
+        self.actionCohort.triggered.connect(openCohortDialog)
+
+    def __initFiltersAction(self):
+        def openFiltersDialog():
+            fd = FiltersDialog(parent   = self,
+                               names    = list(self.helper.names),
+                               settings = self.filterSettings)
+            fd.show()
+        
+        self.actionFilters.triggered.connect(openFiltersDialog)
+
     def __initNewPlotAction(self):
         def newPlotWindow():
             pw = PlotWindow(self)
+            #The number of the window in the published features
+            pw.stream = self.plotCount
+            self.plotCount += 1
             self.windowList.append(pw)
-            self.functions.append(pw.update)
+            self.scheduler.add(pw, pw.intervalTicks(self.simDelay))
             pw.show()
         
         self.prevSaveDir = ""
@@ -121,26 +167,39 @@ class ApplicationWindow(QtWidgets.QMainWindow):
                     #Settings preparation
                     ica=self.icaCB.isChecked()
                     normalize=self.normalizeCB.isChecked()
+                    dtype = np.float32 if self.float32CB.isChecked() else\
+                            np.float64
                     
-                    #Helper creation
+                    #Helper creation in the background
                     ext = os.path.splitext(filename[0])[1]
-                    if ext == ".edf":
-                        self.helper = EDFHelper(filename[0],
-                                                ICA=ica, normalize=normalize)
-                    else:
+                    sampleRate = None
+                    if ext != ".edf":
                         sampleRate, state = QtWidgets.QInputDialog.getInt(self,
                                 "Sample Rate", "Sample Rate", value=128, min=0)
-                        
-                        self.helper = CSVHelper(filename[0],
-                                                sampleRate=sampleRate,
-                                                ICA=ica, normalize=normalize)
                     
-                    # Letting the user select the channels
-                    nChannels = self.helper.nChannels
-                    names     = self.helper.names
-                    dialog = ChannelSelectorDialog(nChannels, names, self)
-                    if(dialog.exec()):
-                        self.helper.selectSignals(dialog.getChannel())
+                    # The channels are selected while the file is loading
+                    dialog = LoadDialog(filename[0], self,
+                                        sampleRate = sampleRate,
+                                        ICA = ica, normalize = normalize,
+                                        dtype = dtype)
+                    if not dialog.exec():
+                        if dialog.error is not None:
+                            raise dialog.error
+                        return
+                    self.helper = dialog.helper
+                    
+                    # The annotations are indexed once for all the plots
+                    self.annotations = AnnotationIndex.fromFile(filename[0])
+                    
+                    # The file is read in the chosen precision, but ICA and
+                    # the normalization return float64
+                    self.helper.data = self.helper.data.astype(dtype,
+                                                               copy=False)
+                    self.eegSettings["dtype"] = dtype
+                    
+                    channels = dialog.channels
+                    if channels is not None:
+                        self.helper.selectSignals(list(channels))
                     
                     del dialog
                     
@@ -154,11 +213,32 @@ class ApplicationWindow(QtWidgets.QMainWindow):
                     sampleRate = self.helper.sampleRate
                     self.eegSettings["sampleRate"] = self.helper.sampleRate
                     
+                    #The helper reads the preprocessed samples from now on
+                    self.filters = FilterPipeline(self.helper.data, sampleRate)
+                    try:
+                        self.filters.configure(**self.filterSettings)
+                    except ValueError as e:
+                        #The filters of the previous file may not fit this one
+                        self.filterSettings = {}
+                        QtWidgets.QMessageBox.warning(self, "Filters",
+                                      "The filters were disabled.\n" + str(e),
+                                      QtWidgets.QMessageBox.Ok)
+                    self.helper.data = self.filters.data
+                    self.actionFilters.setEnabled(True)
+                    
                     #Giving feedback to user
                     self.feedBackLabel.setText("File oppened properly")
                     self.stopInput.setText(str(len(self.helper) / sampleRate))
                     self.windowSizeInput.setText(str(windowSize))
                     
+                    #The overview is built in the background from the file
+                    self.overview.open(filename[0], sampleRate, channels)
+                    self.overview.setVisible(True)
+                    self._updateTimelineRange()
+                    
+                    #The workers need the data of the new file
+                    self.setFeatureProcesses(self.featureProcesses)
+                    
                     #Unlocking locked inputs
                     self.__setState("STOP")
                     
@@ -209,6 +289,7 @@ class ApplicationWindow(QtWidgets.QMainWindow):
             self.feedBackLabel.setText("New settings have been setted")
             self.__setState("STOP")
             self.helper.prepareEEG(windowSize)
+            self._updateTimelineRange()
             self._resetPlots()
             
 
@@ -218,6 +299,53 @@ class ApplicationWindow(QtWidgets.QMainWindow):
         self.startInput.setValidator(QtGui.QDoubleValidator())
         self.stopInput.setValidator(QtGui.QDoubleValidator())
         
+    def __initTimeline(self):
+        self.timelineSlider.valueChanged.connect(self._seek)
+
+    def __initOverview(self):
+        self.overview = OverviewWidget(self)
+        self.overview.setVisible(False)
+        self.overview.sigSeek.connect(self.timelineSlider.setValue)
+        
+        index = self.verticalLayout.indexOf(self.runBox) + 1
+        self.verticalLayout.insertWidget(index, self.overview)
+
+    def _updateTimelineRange(self):
+        windowSize = self.eegSettings["windowSize"]
+        self.timelineSlider.blockSignals(True)
+        self.timelineSlider.setRange(0, max(0, len(self.helper) - windowSize))
+        self.timelineSlider.setPageStep(int(self.eegSettings["sampleRate"]))
+        self.timelineSlider.setValue(0)
+        self.timelineSlider.blockSignals(False)
+        self.overview.setWindow(0, windowSize)
+
+    def _seek(self, position):
+        """
+        Moves the playback to the sample position. The window of the helper
+        is moved directly, so the cost doesn't depend on the distance.
+        """
+        sampleRate = self.eegSettings["sampleRate"]
+        sec = position / sampleRate
+        self.startInput.setText("%.2f" % sec)
+        self.overview.setWindow(position, self.eegSettings["windowSize"])
+        
+        if self.state == "STOP":
+            return
+        
+        previous = self.iterator.auxPoint
+        self.iterator.auxPoint = position
+        try:
+            self._nextWindow()
+        except StopIteration:
+            #Beyond the stop point
+            self.iterator.auxPoint = previous
+            return
+        
+        self.timePosition = sec
+        for window in self.windowList:
+            window.seek(sec)
+        self.scheduler.restart()
+
     def _pause(self):
         self.semaphore.release(1)
         self.stopSignal.emit()
@@ -255,7 +383,7 @@ class ApplicationWindow(QtWidgets.QMainWindow):
             
             #Next iteration to test if values are correct
             try:
-                next(self.iterator)
+                self._nextWindow()
             except StopIteration:
                 QtWidgets.QMessageBox.warning(self, "Error", 
                                  "The start and stop points are too close",
@@ -264,6 +392,11 @@ class ApplicationWindow(QtWidgets.QMainWindow):
             #Initialize animations of windows
             for window in self.windowList:
                 window.initAnimation(start)
+            self.scheduler.restart()
+        
+        #The intervals in seconds depend on simDelay
+        for window in self.windowList:
+            self.setUpdateInterval(window)
         
         #Init semaphore and loopTrigger
         self.semaphore=QSemaphore(0)
@@ -293,12 +426,18 @@ class ApplicationWindow(QtWidgets.QMainWindow):
     @pyqtSlot()
     def __playAnimation(self):
         try:
-            next(self.iterator)
-            for function in self.functions:
+            self._nextWindow()
+            updated = []
+            for window, ticks in self.scheduler.due():
+                t0 = time.perf_counter()
                 try:
-                    function()
+                    window.update(ticks)
                 except:
-                    self.functions.remove(function)
+                    self.scheduler.remove(window)
+                    continue
+                self.scheduler.record(window, time.perf_counter() - t0)
+                updated.append(window)
+            self._publish(updated)
             
             self.app.processEvents()
             self.semaphore.release(1)
@@ -311,13 +450,137 @@ class ApplicationWindow(QtWidgets.QMainWindow):
     def __updateFields(self):
         self.timePosition += self.simDelay
         self.startInput.setText("%.2f" % self.timePosition)
+        
+        position = int(round(self.timePosition*self.eegSettings["sampleRate"]))
+        self.timelineSlider.blockSignals(True)
+        self.timelineSlider.setValue(position)
+        self.timelineSlider.blockSignals(False)
+        self.overview.setWindow(position, self.eegSettings["windowSize"])
+    
+    def _nextWindow(self):
+        """
+        Moves the iterator to the next window, preprocessing its samples
+        first.
+        """
+        start = self.iterator.auxPoint
+        self.filters.ensure(start, start + self.eegSettings["windowSize"])
+        next(self.iterator)
+    
+    def setFeatureProcesses(self, processes):
+        """
+        Sets the number of processes that compute the features. The recording
+        is shared with them through shared memory.
+        """
+        self.featureProcesses = processes
+        self._shareRecording()
+        self._resetPlots()
+    
+    def _shareRecording(self):
+        """
+        Starts the pool of worker processes and moves to the shared block the
+        samples they read. Without preprocessing these are the raw samples,
+        that are not kept outside the block, so the recording is held once.
+        With it the preprocessed samples are written directly in the block.
+        """
+        if self.workerPool is not None:
+            #The shared block is going to be released
+            if self.filters.raw is self.workerPool.recording.array:
+                self.filters.setRaw(np.array(self.filters.raw))
+            self.filters.setBuffer(None)
+            self.helper.data = self.filters.data
+            self.workerPool.close()
+            self.workerPool = None
+        
+        if self.featureProcesses > 0 and self.filters is not None:
+            self.workerPool = SharedWorkerPool(self.filters.raw,
+                                               self.featureProcesses)
+            if self.filters.active:
+                self.filters.setBuffer(self.workerPool.recording.array)
+            else:
+                self.filters.setRaw(self.workerPool.recording.array)
+            self.helper.data = self.filters.data
+        
+        for window in self.windowList:
+            window.setWorkerPool(self.workerPool)
     
+    def setFilters(self, settings):
+        """
+        Sets the preprocessing of the signals. If the playback is running the
+        plots continue from the current position with the new samples.
+        """
+        if self.filters is None:
+            self.filterSettings = settings
+            return
+        
+        wasActive = self.filters.active
+        #It raises a ValueError before changing anything if the settings
+        #can't be applied to the recording
+        self.filters.configure(**settings)
+        self.filterSettings = settings
+        if self.workerPool is not None and self.filters.active != wasActive:
+            #The workers must read the raw or the preprocessed samples
+            self._shareRecording()
+        self.helper.data = self.filters.data
+        
+        #The features cached were computed with the previous samples
+        for window in self.windowList:
+            window.clearCache()
+        
+        if self.state in ("PLAY", "PAUSE"):
+            position = self.iterator.auxPoint - self.iterator.step
+            self._seek(max(0, position))
+
+    def setPublisher(self, address):
+        """
+        Publishes the features computed in each step to the subscribers
+        connected to address, "host:port" or the path of a Unix socket. If
+        address is empty nothing is published.
+        """
+        if self.publisher is not None:
+            self.publisher.close()
+            self.publisher = None
+        
+        self.publisherAddress = address
+        if address:
+            self.publisher = FeaturePublisher(address)
+    
+    def setUpdateInterval(self, window):
+        """
+        Updates the interval of a plot window in the scheduler.
+        """
+        if window in self.scheduler:
+            self.scheduler.setInterval(window,
+                                       window.intervalTicks(self.simDelay))
+    
+    def _publish(self, windows):
+        """
+        Publishes the features of the windows updated in the current tick.
+        """
+        if self.publisher is None:
+            return
+        
+        for window in windows:
+            frame = window.frame()
+            if frame is not None:
+                names, values = frame
+                self.publisher.publish(window.stream, window.windowTitle(),
+                                       self.timePosition, names, values)
+    
+    def closeEvent(self, event):
+        self.overview.cancel()
+        if self.workerPool is not None:
+            self.workerPool.close()
+        if self.publisher is not None:
+            self.publisher.close()
+        super().closeEvent(event)
+
     def _resetPlots(self):
         for win in self.windowList:
             win.reset()
 
     def deleteWinFromList(self, win):
         self.windowList.remove(win)
+        self.scheduler.remove(win)
 
 if __name__ == '__main__':
     qApp = QtWidgets.QApplication(sys.argv)
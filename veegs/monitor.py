@@ -0,0 +1,319 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+This module monitors features of a recording without plotting them. The
+windows are processed as fast as the file can be read, the features that the
+rules use are computed for each one, and an event is emitted every time a rule
+starts or stops being met.
+
+A rule is defined by a dict like this one:
+
+    {"name": "high engagement", "feature": "engagementLevel",
+     "above": 0.8, "hysteresis": 0.05, "duration": 2}
+
+It is met once the feature stays above 0.8, or below if "below" is used
+instead, for 2 seconds, and stops being met when the feature goes below
+0.8 - 0.05. The features are written as:
+
+- "engagementLevel": the engagement level of all the channels.
+- "function:channel": a one channel feature of eeglib, like "hjorthMobility:Cz"
+  or "PFD:0".
+- "ratio:band/band:channel": the ratio between the power of two bands, like
+  "ratio:theta/beta:Fz".
+"""
+
+import argparse
+import json
+import socket
+import sys
+import time
+
+import numpy as np
+
+from eeglib.eeg import EEG
+
+from .fileReaders import readHeader, readBlocks
+from .publisher import parseAddress
+from . import kernels
+
+
+class Rule():
+    """
+    This class tracks whether a feature meets a threshold. The threshold must
+    be met for duration seconds to start the rule, and crossed back by more
+    than hysteresis to stop it, so a noisy feature doesn't produce an event
+    in every window.
+    """
+    def __init__(self, name, feature, threshold, above=True, hysteresis=0,
+                 duration=0):
+        self.name = name
+        self.feature = feature
+        self.threshold = threshold
+        self.above = above
+        self.hysteresis = hysteresis
+        self.duration = duration
+        self.reset()
+
+    @classmethod
+    def fromDict(cls, rule):
+        if ("above" in rule) == ("below" in rule):
+            raise ValueError("The rule %s must have either above or below." %
+                             rule.get("name"))
+        above = "above" in rule
+        return cls(rule.get("name", rule["feature"]), rule["feature"],
+                   rule["above"] if above else rule["below"], above,
+                   rule.get("hysteresis", 0), rule.get("duration", 0))
+
+    def reset(self):
+        self.active = False
+        #Time when the threshold started to be met, None if it isn't met
+        self.since = None
+
+    def _meets(self, value, threshold):
+        return value > threshold if self.above else value < threshold
+
+    def update(self, time, value):
+        """
+        Evaluates the value of the feature at a time.
+
+        Returns
+        -------
+        dict or None
+            The event if the rule started or stopped being met.
+        """
+        if not self.active:
+            if not self._meets(value, self.threshold):
+                self.since = None
+                return None
+            if self.since is None:
+                self.since = time
+            if time - self.since >= self.duration:
+                self.active = True
+                return self._event("start", time, value)
+        else:
+            #The threshold has to be crossed back by the hysteresis
+            margin = self.hysteresis if self.above else -self.hysteresis
+            if not self._meets(value, self.threshold - margin):
+                event = self._event("end", time, value)
+                self.reset()
+                return event
+        return None
+
+    def _event(self, kind, time, value):
+        return {"rule": self.name, "event": kind, "time": time,
+                "onset": self.since, "feature": self.feature,
+                "value": float(value)}
+
+
+class FeatureEvaluator():
+    """
+    This class computes the features used by the rules for each window. The
+    features shared by several rules and the band powers are computed once
+    per window.
+    """
+    def __init__(self, features, windowSize, sampleRate, names):
+        self.eeg = EEG(windowSize, sampleRate, len(names))
+        self.names = list(names)
+        self.functions = {feature: self._parse(feature)
+                          for feature in features}
+
+    def _channel(self, channel):
+        if channel in self.names:
+            return self.names.index(channel)
+        try:
+            return int(channel)
+        except ValueError:
+            raise ValueError("There isn't a channel named %s." % channel)
+
+    def _parse(self, feature):
+        parts = feature.split(":")
+        if len(parts) == 1:
+            return getattr(self.eeg, parts[0])
+
+        if parts[0] == "ratio" and len(parts) == 3:
+            numerator, denominator = parts[1].split("/")
+            channel = self._channel(parts[2])
+            def ratio():
+                bands = self._bandPower(channel)
+                return bands[numerator] / bands[denominator]
+            return ratio
+
+        if len(parts) == 2:
+            channel = self._channel(parts[1])
+            if parts[0] in kernels.batchedFeatures:
+                kernel = kernels.batchedFeatures[parts[0]]
+                return lambda: kernel(self.eeg.getChannel(channel))
+            method = getattr(self.eeg, parts[0])
+            return lambda: method(channel)
+
+        raise ValueError("%s is not a valid feature." % feature)
+
+    def _bandPower(self, channel):
+        if channel not in self.bandPowers:
+            self.bandPowers[channel] = self.eeg.bandPower(channel)
+        return self.bandPowers[channel]
+
+    def evaluate(self, window):
+        """
+        Returns the value of each feature for a window in the shape
+        (nChannels, windowSize).
+        """
+        self.eeg.set(window, columnMode=True)
+        self.bandPowers = {}
+        return {feature: function()
+                for feature, function in self.functions.items()}
+
+
+def _windows(path, windowSize, step, sampleRate, blockSeconds=60):
+    """
+    Yields the position and the samples of every window of a file, reading it
+    in blocks so the memory doesn't depend on its length.
+    """
+    pending = None
+    offset = 0
+    position = 0
+    for start, block, _, _ in readBlocks(path, int(blockSeconds*sampleRate)):
+        pending = block if pending is None else np.hstack([pending, block])
+        while position + windowSize <= offset + pending.shape[1]:
+            begin = position - offset
+            yield position, pending[:, begin:begin + windowSize]
+            position += step
+        #Only the samples of the next windows are kept
+        drop = min(position - offset, pending.shape[1])
+        pending = pending[:, drop:]
+        offset += drop
+
+
+class EventSink():
+    """
+    Writes the events as JSON lines to a file and to a socket.
+    """
+    def __init__(self, log=None, address=None):
+        self.log = log
+        self.sock = None
+        if address:
+            family, target = parseAddress(address)
+            self.sock = socket.socket(family, socket.SOCK_STREAM)
+            self.sock.connect(target)
+
+    def write(self, event):
+        line = json.dumps(event) + "\n"
+        if self.log is not None:
+            self.log.write(line)
+            self.log.flush()
+        if self.sock is not None:
+            self.sock.sendall(line.encode())
+
+    def close(self):
+        if self.sock is not None:
+            self.sock.close()
+
+
+def monitor(path, rules, windowSeconds=1, stepSeconds=0.125, sampleRate=None,
+            sink=None, report=None, reportSeconds=5):
+    """
+    Evaluates the rules over every window of a file.
+
+    Parameters
+    ----------
+    path: str
+        The path of the EDF or CSV file.
+    rules: list of Rule
+        The rules to evaluate.
+    windowSeconds, stepSeconds: float
+        The size of the windows and the distance between them in seconds.
+    sampleRate: numeric, optional
+        The sample rate of the CSV files.
+    sink: EventSink, optional
+        Where the events are written.
+    report: callable, optional
+        It is called every reportSeconds with the number of windows processed
+        and the windows per second since the previous call.
+
+    Returns
+    -------
+    dict
+        The number of windows and events, the seconds spent and the sustained
+        windows per second.
+    """
+    nSamples, sampleRate, names = readHeader(path, sampleRate)
+    windowSize = int(round(windowSeconds * sampleRate))
+    step = max(1, int(round(stepSeconds * sampleRate)))
+
+    evaluator = FeatureEvaluator({rule.feature for rule in rules}, windowSize,
+                                 sampleRate, names)
+    for rule in rules:
+        rule.reset()
+
+    nWindows = nEvents = 0
+    t0 = lastReport = time.perf_counter()
+    lastWindows = 0
+    for position, window in _windows(path, windowSize, step, sampleRate):
+        values = evaluator.evaluate(window)
+        #The time of a window is the time of its last sample
+        windowTime = (position + windowSize) / sampleRate
+        for rule in rules:
+            event = rule.update(windowTime, values[rule.feature])
+            if event is not None:
+                nEvents += 1
+                if sink is not None:
+                    sink.write(event)
+        nWindows += 1
+
+        now = time.perf_counter()
+        if report is not None and now - lastReport >= reportSeconds:
+            report(nWindows, (nWindows - lastWindows) / (now - lastReport))
+            lastReport, lastWindows = now, nWindows
+
+    seconds = time.perf_counter() - t0
+    return {"windows": nWindows, "events": nEvents, "seconds": seconds,
+            "windowsPerSecond": nWindows / seconds if seconds else 0}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Evaluates threshold rules "+
+                                     "over the features of an EDF/CSV file "+
+                                     "without plotting them.")
+    parser.add_argument("file", help="The EDF or CSV file.")
+    parser.add_argument("rules", help="A JSON file with a list of rules.")
+    parser.add_argument("-w", "--window", type=float, default=1,
+                        help="Window size in seconds.")
+    parser.add_argument("-s", "--step", type=float, default=0.125,
+                        help="Step between windows in seconds.")
+    parser.add_argument("-r", "--sample-rate", type=float, default=None,
+                        help="Sample rate of the CSV files.")
+    parser.add_argument("-l", "--log", default="-",
+                        help="File where the events are appended. Default: "+
+                        "the standard output.")
+    parser.add_argument("--socket", default=None,
+                        help="host:port or the path of a Unix socket where "+
+                        "the events are sent.")
+    parser.add_argument("--report", type=float, default=5,
+                        help="Seconds between throughput reports.")
+    args = parser.parse_args(argv)
+
+    with open(args.rules) as rulesFile:
+        rules = [Rule.fromDict(rule) for rule in json.load(rulesFile)]
+
+    kernels.warmUp()
+
+    log = sys.stdout if args.log == "-" else open(args.log, "a")
+    sink = EventSink(log, args.socket)
+
+    def printReport(nWindows, windowsPerSecond):
+        print("%d windows, %.1f windows/s" % (nWindows, windowsPerSecond),
+              file=sys.stderr)
+
+    try:
+        stats = monitor(args.file, rules, args.window, args.step,
+                        args.sample_rate, sink, printReport, args.report)
+    finally:
+        sink.close()
+        if log is not sys.stdout:
+            log.close()
+
+    print("%(windows)d windows, %(events)d events in %(seconds).2fs: " %
+          stats + "%(windowsPerSecond).1f windows/s" % stats, file=sys.stderr)
+
+if __name__ == '__main__':
+    main()
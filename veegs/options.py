@@ -3,27 +3,44 @@ import sys
 
 from PyQt5 import QtCore, QtWidgets, QtGui,uic
 
+from . import spectra
+
 class OptionsDialog(QtWidgets.QDialog):
     """
     This is a menu for establishing especial options in the program.
     """
-    def __init__(self, parent=None, samples=16, speedMul=1.0):
+    def __init__(self, parent=None, samples=16, speedMul=1.0, processes=0,
+                 address=""):
         QtWidgets.QDialog.__init__(self, parent)
         
         selfdir = os.path.dirname(__file__)
         uic.loadUi(os.path.join(selfdir,"optionsDialog.ui"), self)
         self.setAttribute(QtCore.Qt.WA_DeleteOnClose)
 
-        self.__initInputs(samples,speedMul)
+        self.__initInputs(samples,speedMul,processes,address)
         self.__initAccepted()
 
-    def __initInputs(self,samples,speedMul):
-        self.siInput.setValidator(QtGui.QIntValidator(1, sys.maxsize))
+    def __initInputs(self,samples,speedMul,processes,address):
+        self.siInput.setValidator(QtGui.QIntValidator(1, 2**31 - 1))
         self.siInput.setText(str(samples))
         
         self.speedMulInput.setValidator(QtGui.QDoubleValidator(0, 
                                                         sys.float_info.max, 4))
         self.speedMulInput.setText(str(speedMul))
+        
+        self.processesInput.setValidator(QtGui.QIntValidator(0, 1024))
+        self.processesInput.setText(str(processes))
+        
+        self.publishInput.setText(address)
+        
+        backend = spectra.getBackend()
+        self.fftBackendInput.addItems(list(spectra.backends))
+        self.fftBackendInput.setCurrentText(backend.name)
+        self.fftWorkersInput.setValidator(QtGui.QIntValidator(1, 1024))
+        self.fftWorkersInput.setText(str(getattr(backend, "workers", 1)))
+        self.fftBackendInput.currentTextChanged.connect(
+                lambda name: self.fftWorkersInput.setEnabled(name == "scipy"))
+        self.fftWorkersInput.setEnabled(backend.name == "scipy")
 
     def __initAccepted(self):
         def setDelays():
@@ -38,5 +55,23 @@ class OptionsDialog(QtWidgets.QDialog):
             self.parent().simDelay = simDelay 
             self.parent().rtDelay  = rtDelay
             
+            processes = int(self.processesInput.text())
+            if processes != self.parent().featureProcesses:
+                self.parent().setFeatureProcesses(processes)
+            
+            workers = self.fftWorkersInput.text()
+            spectra.setBackend(self.fftBackendInput.currentText(),
+                               int(workers) if workers else None)
+            
+            address = self.publishInput.text().strip()
+            if address != self.parent().publisherAddress:
+                try:
+                    self.parent().setPublisher(address)
+                except OSError as e:
+                    QtWidgets.QMessageBox.warning(self.parent(), "Error",
+                                                  "The features can't be " +
+                                                  "published\n" + str(e),
+                                                  QtWidgets.QMessageBox.Ok)
+            
 
         self.buttonBox.accepted.connect(setDelays)
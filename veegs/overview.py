@@ -0,0 +1,307 @@
+"""
+This module defines an overview of a whole recording: the envelope (minimum
+and maximum) of each channel and a few summary features computed for every
+second, kept in a pyramid of decreasing resolutions. The overview is built
+reading the file once in blocks and it is cached on disk next to the file, so
+the next time the file is opened it is available at once.
+
+The finest level has a bounded number of bins whatever the duration of the
+recording, and drawing it only needs the level closest to the pixels
+available, so the cost of drawing doesn't depend on the duration either.
+"""
+
+import os
+
+import numpy as np
+
+from .fileReaders import readHeader, readBlocks
+from . import kernels
+
+#It must change every time the format of the cache changes
+version = 1
+
+
+def _lineLength(segments):
+    return np.abs(np.diff(segments, axis=-1)).mean(axis=-1)
+
+
+def _PFD(segments):
+    return kernels.PFD(segments.reshape(-1, segments.shape[-1])).reshape(
+                                                            segments.shape[:-1])
+
+
+#Features computed for each second of every channel. They receive the seconds
+#in the shape (..., samples)
+summaryFeatures = {"Standard Deviation": lambda segments: segments.std(axis=-1),
+                   "Line Length": _lineLength,
+                   "PFD": _PFD}
+
+
+class _Reducer():
+    """
+    Accumulates the samples of consecutive blocks and reduces them in bins of
+    size samples, keeping the samples of the incomplete bin for the next block.
+    """
+    def __init__(self, size, function):
+        self.size = size
+        self.function = function
+        self.pending = None
+        self.result = []
+
+    def add(self, block):
+        data = block if self.pending is None else np.hstack([self.pending,
+                                                             block])
+        full = data.shape[1] // self.size * self.size
+        if full:
+            self.result.append(self.function(
+                data[:, :full].reshape(len(data), -1, self.size)))
+        self.pending = data[:, full:]
+
+    def finish(self, partial=True):
+        """
+        Returns the bins, including the last incomplete one if partial.
+        """
+        if partial and self.pending is not None and self.pending.shape[1]:
+            self.result.append(self.function(self.pending[:, None, :]))
+        return np.concatenate(self.result, axis=-1)
+
+
+def _decimate(array, factor, function):
+    """
+    Joins every factor bins of the last axis in one, the last one can have
+    less bins.
+    """
+    indices = np.arange(0, array.shape[-1], factor)
+    if function == "mean":
+        counts = np.diff(np.append(indices, array.shape[-1]))
+        return np.add.reduceat(array, indices, axis=-1) / counts
+    return function.reduceat(array, indices, axis=-1)
+
+
+class Overview():
+    """
+    This class stores the overview of a recording. The envelope and the
+    features are stored as lists of levels, the first one with the finest
+    resolution and each of the next ones joining factor bins of the previous
+    one.
+    """
+    maxBins = 8192
+    minBins = 64
+    factor  = 4
+
+    def __init__(self, names, sampleRate, nSamples, binSamples, featureBin,
+                 envelope, features):
+        """
+        Parameters
+        ----------
+        names: list of str
+            The names of the channels of the file.
+        sampleRate: numeric
+            The sample rate of the file.
+        nSamples: int
+            The number of samples of each channel.
+        binSamples, featureBin: int
+            The samples of each bin of the first level of the envelope and the
+            features.
+        envelope: list of numpy.ndarray
+            The levels of the envelope in the shape (2, nChannels, nBins), the
+            minimum and the maximum.
+        features: list of numpy.ndarray
+            The levels of the features in the shape (nFeatures, nChannels,
+            nBins), in the order of summaryFeatures.
+        """
+        self.names = list(names)
+        self.sampleRate = sampleRate
+        self.nSamples = nSamples
+        self.binSamples = binSamples
+        self.featureBin = featureBin
+        self.envelope = envelope
+        self.features = features
+        self.featureNames = list(summaryFeatures)
+
+    @classmethod
+    def _levels(cls, array, decimate):
+        levels = [array]
+        while levels[-1].shape[-1] > cls.minBins:
+            levels.append(decimate(levels[-1]))
+        return levels
+
+    @classmethod
+    def _decimateEnvelope(cls, level):
+        return np.stack([_decimate(level[0], cls.factor, np.minimum),
+                         _decimate(level[1], cls.factor, np.maximum)])
+
+    @classmethod
+    def _decimateFeatures(cls, level):
+        return _decimate(level, cls.factor, "mean").astype(level.dtype)
+
+    @classmethod
+    def build(cls, path, sampleRate=None, progress=None, isCancelled=None,
+              blockSeconds=60):
+        """
+        Builds the overview of a file reading it in blocks.
+
+        Parameters
+        ----------
+        path: str
+            The path of the EDF or CSV file.
+        sampleRate: numeric, optional
+            The sample rate of the CSV files.
+        progress: callable, optional
+            It is called after each block with the bytes read and the size of
+            the file.
+        isCancelled: callable, optional
+            It is called after each block, and if it returns True the building
+            stops and None is returned.
+
+        Returns
+        -------
+        Overview or None
+        """
+        nSamples, sampleRate, names = readHeader(path, sampleRate)
+        second = max(1, int(round(sampleRate)))
+
+        #The bins are as small as possible without exceeding maxBins
+        binSamples = max(1, -(-nSamples // cls.maxBins))
+        secondsPerBin = max(1, -(-(nSamples // second) // cls.maxBins))
+        featureBin = second * secondsPerBin
+
+        def envelope(bins):
+            return np.stack([bins.min(axis=-1), bins.max(axis=-1)]).astype(
+                                                                     np.float32)
+
+        def features(bins):
+            seconds = bins.reshape(bins.shape[:2] + (secondsPerBin, second))
+            return np.stack([function(seconds).mean(axis=-1)
+                             for function in summaryFeatures.values()]).astype(
+                                                                     np.float32)
+
+        envelopeReducer = _Reducer(binSamples, envelope)
+        featuresReducer = _Reducer(featureBin, features)
+        for _, block, bytesRead, size in readBlocks(path,
+                                                  int(blockSeconds*sampleRate)):
+            envelopeReducer.add(block)
+            featuresReducer.add(block)
+            if progress is not None:
+                progress(bytesRead, size)
+            if isCancelled is not None and isCancelled():
+                return None
+
+        #The features of the last incomplete bin are not computed
+        featureLevel = featuresReducer.finish(partial=False) if\
+                       featuresReducer.result else\
+                       np.empty((len(summaryFeatures), len(names), 0),
+                                dtype=np.float32)
+
+        return cls(names, sampleRate, nSamples, binSamples, featureBin,
+                   cls._levels(envelopeReducer.finish(),
+                               cls._decimateEnvelope),
+                   cls._levels(featureLevel, cls._decimateFeatures))
+
+    @staticmethod
+    def cachePath(path):
+        return path + ".overview.npz"
+
+    @staticmethod
+    def _fileStamp(path):
+        stat = os.stat(path)
+        return np.array([stat.st_size, stat.st_mtime_ns], dtype=np.int64)
+
+    def save(self, path):
+        """
+        Stores the overview of the file in path next to it. It is written to
+        a temporary file first so an interrupted save never leaves a broken
+        cache.
+        """
+        arrays = {"envelope%d" % i: level
+                  for i, level in enumerate(self.envelope)}
+        arrays.update({"features%d" % i: level
+                       for i, level in enumerate(self.features)})
+        cache = self.cachePath(path)
+        with open(cache + ".tmp", "wb") as file:
+            np.savez(file, version=version, stamp=self._fileStamp(path),
+                     names=np.array(self.names, dtype=str),
+                     featureNames=np.array(self.featureNames, dtype=str),
+                     sizes=np.array([self.sampleRate, self.nSamples,
+                                     self.binSamples, self.featureBin]),
+                     **arrays)
+        os.replace(cache + ".tmp", cache)
+
+    @classmethod
+    def load(cls, path, sampleRate=None):
+        """
+        Returns the cached overview of the file in path, or None if there
+        isn't one or it is outdated.
+        """
+        try:
+            with np.load(cls.cachePath(path)) as cache:
+                if (int(cache["version"]) != version or
+                    not np.array_equal(cache["stamp"], cls._fileStamp(path)) or
+                    list(cache["featureNames"]) != list(summaryFeatures)):
+                    return None
+                fileRate, nSamples, binSamples, featureBin = cache["sizes"]
+                if sampleRate and sampleRate != fileRate:
+                    return None
+                envelope = [cache["envelope%d" % i] for i in
+                            range(sum(k.startswith("envelope")
+                                      for k in cache.files))]
+                features = [cache["features%d" % i] for i in
+                            range(sum(k.startswith("features")
+                                      for k in cache.files))]
+                return cls(list(cache["names"]), fileRate, int(nSamples),
+                           int(binSamples), int(featureBin), envelope,
+                           features)
+        except (OSError, KeyError, ValueError):
+            return None
+
+    @classmethod
+    def open(cls, path, sampleRate=None, progress=None, isCancelled=None):
+        """
+        Returns the cached overview of a file, building and caching it if it
+        isn't cached yet. If the directory of the file isn't writable the
+        overview is built without caching it.
+        """
+        overview = cls.load(path, sampleRate)
+        if overview is None:
+            overview = cls.build(path, sampleRate, progress, isCancelled)
+            if overview is not None:
+                try:
+                    overview.save(path)
+                except OSError:
+                    pass
+        return overview
+
+    def _level(self, levels, binSamples, pixels):
+        """
+        Returns the time of the center of each bin and the coarsest level
+        that has at least one bin for each pixel.
+        """
+        i = 0
+        while (i + 1 < len(levels) and
+               levels[i + 1].shape[-1] >= pixels):
+            i += 1
+        size = binSamples * self.factor**i
+        times = (np.arange(levels[i].shape[-1]) + 0.5) * size / self.sampleRate
+        return times, levels[i]
+
+    def getEnvelope(self, pixels):
+        """
+        Returns the time of each bin and the envelope in the shape (2,
+        nChannels, nBins), with enough bins for the pixels given.
+        """
+        return self._level(self.envelope, self.binSamples, pixels)
+
+    def getFeature(self, feature, pixels):
+        """
+        Returns the time of each bin and the values of a summary feature in
+        the shape (nChannels, nBins), with enough bins for the pixels given.
+        """
+        times, level = self._level(self.features, self.featureBin, pixels)
+        return times, level[self.featureNames.index(feature)]
+
+    def getRange(self):
+        """
+        Returns the minimum and maximum of each channel in the whole file.
+        """
+        coarsest = self.envelope[-1]
+        return coarsest[0].min(axis=-1), coarsest[1].max(axis=-1)
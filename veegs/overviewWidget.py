@@ -0,0 +1,227 @@
+import numpy as np
+import pyqtgraph as pg
+from PyQt5 import QtWidgets
+from PyQt5.QtCore import QObject, QThread, pyqtSlot, pyqtSignal
+
+from .overview import Overview, summaryFeatures
+
+
+class OverviewBuilder(QObject):
+    """
+    This class opens the overview of a file in a separated thread, building
+    it if it isn't cached.
+    """
+    sigProgress = pyqtSignal("qint64", "qint64")
+    sigFinished = pyqtSignal(object)
+    sigFailed   = pyqtSignal(object)
+
+    def __init__(self, path, sampleRate=None):
+        super().__init__()
+        self.path = path
+        self.sampleRate = sampleRate
+        self.cancelled = False
+
+    def cancel(self):
+        """
+        Stops the building after the current block. It must be called
+        directly, since the thread doesn't process events while reading.
+        """
+        self.cancelled = True
+
+    @pyqtSlot()
+    def run(self):
+        try:
+            overview = Overview.open(self.path, self.sampleRate,
+                                     self.sigProgress.emit,
+                                     lambda: self.cancelled)
+            if overview is not None and not self.cancelled:
+                self.sigFinished.emit(overview)
+        except Exception as e:
+            self.sigFailed.emit(e)
+
+
+class OverviewWidget(QtWidgets.QWidget):
+    """
+    This is a strip that shows the envelope of the channels and a summary
+    feature along the whole recording. The window being played is shown as a
+    region that can be dragged to move the playback.
+    """
+    sigSeek = pyqtSignal(int)
+
+    maxChannels = 16
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+
+        self.overview = None
+        self.channels = []
+        self.builder = None
+        self.builderThread = None
+        self.sampleRate = 1
+
+        layout = QtWidgets.QVBoxLayout()
+        layout.setContentsMargins(0, 0, 0, 0)
+        self.setLayout(layout)
+
+        header = QtWidgets.QHBoxLayout()
+        self.infoLabel = QtWidgets.QLabel()
+        header.addWidget(self.infoLabel, 1)
+        self.featureCombo = QtWidgets.QComboBox()
+        self.featureCombo.addItems(list(summaryFeatures))
+        self.featureCombo.setToolTip("Summary feature, averaged over the "+
+                                     "channels")
+        self.featureCombo.currentIndexChanged.connect(self._draw)
+        header.addWidget(self.featureCombo)
+        layout.addLayout(header)
+
+        self.graphics = pg.GraphicsLayoutWidget()
+        self.graphics.setMinimumHeight(140)
+        layout.addWidget(self.graphics)
+
+        self.envelopePlot = self.graphics.addPlot(row=0, col=0)
+        self.featurePlot  = self.graphics.addPlot(row=1, col=0)
+        self.graphics.ci.layout.setRowStretchFactor(0, 3)
+        self.featurePlot.setXLink(self.envelopePlot)
+        for plot in (self.envelopePlot, self.featurePlot):
+            plot.hideAxis("left")
+            plot.hideButtons()
+            plot.setMenuEnabled(False)
+            plot.setMouseEnabled(False, False)
+        self.envelopePlot.hideAxis("bottom")
+
+        #The region is only moved as a whole, its size is the window size
+        self.region = pg.LinearRegionItem()
+        for line in self.region.lines:
+            line.setMovable(False)
+        self.region.setZValue(10)
+        self.region.sigRegionChangeFinished.connect(self._regionMoved)
+        self.envelopePlot.addItem(self.region)
+
+    def open(self, path, sampleRate, channels=None):
+        """
+        Shows the overview of a file, building it in the background if it
+        isn't cached.
+
+        Parameters
+        ----------
+        path: str
+            The path of the EDF or CSV file.
+        sampleRate: numeric
+            The sample rate of the file.
+        channels: list of int, optional
+            The indexes of the channels of the file to show. By default all of
+            them.
+        """
+        self.cancel()
+        self.overview = None
+        self.sampleRate = sampleRate
+        self.channels = channels
+        self.envelopePlot.clear()
+        self.featurePlot.clear()
+        self.envelopePlot.addItem(self.region)
+        self.infoLabel.setText("Building the overview...")
+
+        self.builder = OverviewBuilder(path, sampleRate)
+        self.builder.sigProgress.connect(self._setProgress)
+        self.builder.sigFinished.connect(self._finish)
+        self.builder.sigFailed  .connect(self._fail)
+
+        self.builderThread = QThread()
+        self.builder.moveToThread(self.builderThread)
+        self.builderThread.started.connect(self.builder.run)
+        self.builderThread.start()
+
+    def cancel(self):
+        """
+        Stops the building of the overview, if it is running. The signals of
+        the builder are disconnected, so the ones it has already emitted are
+        ignored.
+        """
+        if self.builderThread is not None:
+            self.builder.cancel()
+            self.builder.sigProgress.disconnect(self._setProgress)
+            self.builder.sigFinished.disconnect(self._finish)
+            self.builder.sigFailed  .disconnect(self._fail)
+            self._stopThread()
+
+    def _stopThread(self):
+        self.builderThread.quit()
+        self.builderThread.wait()
+        self.builderThread = None
+        self.builder = None
+
+    def _isCurrent(self):
+        #The queued signals of a cancelled builder can still be delivered
+        return self.builder is not None and self.sender() is self.builder
+
+    def _setProgress(self, bytesRead, size):
+        if not self._isCurrent():
+            return
+        self.infoLabel.setText("Building the overview... %d%%" %
+                               (100 * bytesRead // max(size, 1)))
+
+    def _finish(self, overview):
+        if not self._isCurrent():
+            return
+        self._stopThread()
+        self.overview = overview
+        self.infoLabel.setText("")
+        if self.channels is None:
+            self.channels = list(range(len(overview.names)))
+        self.minimum, self.maximum = overview.getRange()
+        duration = overview.nSamples / overview.sampleRate
+        self.envelopePlot.setXRange(0, duration, padding=0)
+        self.region.setBounds((0, duration))
+        self._draw()
+
+    def _fail(self, error):
+        if not self._isCurrent():
+            return
+        self._stopThread()
+        self.infoLabel.setText("The overview couldn't be built: %s" % error)
+
+    def _draw(self):
+        """
+        Draws the level of the overview with one bin for each pixel, so the
+        cost doesn't depend on the duration of the recording.
+        """
+        if self.overview is None:
+            return
+        pixels = max(int(self.envelopePlot.vb.width()), 1)
+        channels = self.channels[:self.maxChannels]
+
+        self.envelopePlot.clear()
+        times, envelope = self.overview.getEnvelope(pixels)
+        #Each bin is a vertical line between its minimum and maximum, and the
+        #channels are stacked, each one in a band of height 1
+        x = np.repeat(times, 2)
+        for i, channel in enumerate(channels):
+            span = (self.maximum[channel] - self.minimum[channel]) or 1
+            y = np.stack([envelope[0, channel], envelope[1, channel]], axis=1)
+            y = len(channels) - 1 - i + (y.ravel() - self.minimum[channel])/span
+            self.envelopePlot.plot(x, y, connect="pairs", pen=pg.intColor(i))
+        self.envelopePlot.addItem(self.region)
+
+        self.featurePlot.clear()
+        times, values = self.overview.getFeature(
+                                      self.featureCombo.currentText(), pixels)
+        if values.shape[-1] and channels:
+            self.featurePlot.plot(times, np.nanmean(values[channels], axis=0),
+                                  pen="y")
+
+    def resizeEvent(self, event):
+        super().resizeEvent(event)
+        self._draw()
+
+    def setWindow(self, position, windowSize):
+        """
+        Moves the region to the window that starts at the sample position.
+        """
+        start = position / self.sampleRate
+        self.region.blockSignals(True)
+        self.region.setRegion((start, start + windowSize/self.sampleRate))
+        self.region.blockSignals(False)
+
+    def _regionMoved(self):
+        start = self.region.getRegion()[0]
+        self.sigSeek.emit(int(round(start * self.sampleRate)))
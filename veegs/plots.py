@@ -14,11 +14,43 @@ from itertools import combinations
 
 from eeglib.eeg import defaultBands
 import eeglib.wrapper as wrap
+import eeglib.features as features
 
-from .channelSelector import ChannelSelector, Synchronizer
+from .channelSelector import ChannelSelector, ChannelModel
+from .annotations import AnnotationOverlay
+from .history import FeatureCache, FeatureHistory
+from . import kernels
+from . import plugins
+from . import spectra
 
 defaultBandsNames = list(defaultBands.keys())
 
+#One channel features that can be computed by the worker processes and
+#without the wrapper. The complexity ones are compiled kernels
+sharedFeatures = {"HFD"             : kernels.HFD,
+                  "PFD"             : kernels.PFD,
+                  "hjorthActivity"  : features.hjorthActivity,
+                  "hjorthMobility"  : features.hjorthMobility,
+                  "hjorthComplexity": features.hjorthComplexity,
+                  "MSE"             : kernels.sampEn,
+                  "LZC"             : kernels.LZC,
+                  "DFA"             : kernels.DFA}
+
+
+#Channeless features computed from the band power of all the channels,
+#without the wrapper
+spectralFeatures = {"engagementLevel": spectra.engagementLevel}
+
+
+def applyToChannels(func, window):
+    """
+    Returns the value of a feature of sharedFeatures for each channel of the
+    window.
+    """
+    if func in kernels.batchedFeatures:
+        return kernels.batchedFeatures[func](window)
+    return np.array([sharedFeatures[func](channel) for channel in window])
+
 #Tabs names
 rawTab   = "Raw"
 bandsTab = "Average Band Power"
@@ -50,34 +82,106 @@ class PlotWindow(QtWidgets.QDialog):
         nChannels = parent.helper.nChannels
         names     = parent.helper.names
         self.__addSelectors(nChannels, names)
+        self.__addPluginCheckBoxes()
+        self.__initIntervalInputs()
 
     def __addSelectors(self, nChannels, names = None):
-        synchronizer = Synchronizer()
+        #All the selectors share the same model, so they are synchronized
+        #without propagating the changes from one to another
+        model = ChannelModel(nChannels, names, self)
+        
         #Raw data
-        self.baseSelector = ChannelSelector(nChannels, self, names)
+        self.baseSelector = ChannelSelector(nChannels, self, names,
+                                            model = model)
         self.rawTab.layout().addWidget(self.baseSelector)
-        self.baseSelector.synchronize(synchronizer)
         
         #Average Band Power
-        self.averageBPSelector = ChannelSelector(nChannels, self, names)
+        self.averageBPSelector = ChannelSelector(nChannels, self, names,
+                                                 model = model)
         self.averagePowerBandTab.layout().addWidget(self.averageBPSelector)
-        self.averageBPSelector.synchronize(synchronizer)
         
         # FFT
-        self.fftSelector = ChannelSelector(nChannels,self, names)
+        self.fftSelector = ChannelSelector(nChannels,self, names,
+                                           model = model)
         self.fftTab.layout().addWidget(self.fftSelector)
-        self.fftSelector.synchronize(synchronizer)
         
         #One Channel Features
-        self.featuresSelector = ChannelSelector(nChannels, self, names)
+        self.featuresSelector = ChannelSelector(nChannels, self, names,
+                                                model = model)
         self.oneChannelTab.layout().addWidget(self.featuresSelector)
-        self.featuresSelector.synchronize(synchronizer)
         
         #Two Channel Features
-        self.C2Selector = ChannelSelector(nChannels, self, names)
+        self.C2Selector = ChannelSelector(nChannels, self, names,
+                                          model = model)
         self.twoChannelsTab.layout().addWidget(self.C2Selector)
-        self.C2Selector.synchronize(synchronizer)
     
+    def __addPluginCheckBoxes(self):
+        #A checkbox for each plugin, after the features of its tab
+        self.pluginCBs = {}
+        for plugin in plugins.registry.values():
+            checkBox = QtWidgets.QCheckBox(plugin.name)
+            if plugin.twoChannels:
+                self.horizontalLayout_5.addWidget(checkBox)
+            else:
+                self.verticalLayout_4.addWidget(checkBox)
+            self.pluginCBs[plugin.key] = checkBox
+    
+    def __initIntervalInputs(self):
+        #The bar is kept below the canvas, so the interval can be changed
+        #while playing
+        self.intervalBar = QtWidgets.QWidget()
+        layout = QtWidgets.QHBoxLayout()
+        layout.setContentsMargins(0, 0, 0, 0)
+        self.intervalBar.setLayout(layout)
+        
+        layout.addWidget(QtWidgets.QLabel("Update every"))
+        self.intervalInput = QtWidgets.QDoubleSpinBox()
+        self.intervalInput.setRange(1, 3600)
+        self.intervalInput.setDecimals(0)
+        self.intervalInput.setToolTip("Expensive plots can be updated less "+
+                                      "often than the others")
+        layout.addWidget(self.intervalInput)
+        self.intervalUnits = QtWidgets.QComboBox()
+        self.intervalUnits.addItems(["ticks", "seconds"])
+        layout.addWidget(self.intervalUnits)
+        layout.addStretch()
+        
+        def setUnits(index):
+            seconds = self.intervalUnits.currentText() == "seconds"
+            self.intervalInput.setDecimals(3 if seconds else 0)
+            self.intervalInput.setMinimum(0.001 if seconds else 1)
+            self._intervalChanged()
+        
+        self.intervalInput.valueChanged.connect(self._intervalChanged)
+        self.intervalUnits.currentIndexChanged.connect(setUnits)
+        self.layout.insertWidget(self.layout.indexOf(self.apButton),
+                                 self.intervalBar)
+    
+    def _intervalChanged(self):
+        self.parentWidget().setUpdateInterval(self)
+    
+    def intervalTicks(self, simDelay):
+        """
+        Returns the number of ticks between the updates of the window when
+        each tick advances simDelay seconds.
+        """
+        value = self.intervalInput.value()
+        if self.intervalUnits.currentText() == "seconds":
+            value /= simDelay
+        return max(1, int(round(value)))
+    
+    def _getPluginsFuncsAndNames(self, twoChannels):
+        featuresFuncs = []
+        featuresNames = []
+        
+        for key, checkBox in self.pluginCBs.items():
+            plugin = plugins.registry[key]
+            if plugin.twoChannels == twoChannels and checkBox.isChecked():
+                featuresFuncs.append(key)
+                featuresNames.append(plugin.name)
+        
+        return featuresFuncs, featuresNames
+
     def __initApButton(self):
         def addPlot():
             # Name of current tab
@@ -184,20 +288,84 @@ class PlotWindow(QtWidgets.QDialog):
         self.canvas = self.canvasClass(*self.canvasArgs       , 
                                        self.parent().helper   ,
                                        graphLayout            )
+        self.layout.addWidget(self.intervalBar)
+        self.intervalBar.show()
+        self.canvas.setAnnotations(self.parent().annotations)
+        self.canvas.setWorkerPool(self.parent().workerPool)
 
     def reset(self):
         if hasattr(self, "canvas"):
             self.cleanWidgets()
             self.addCanvas()
 
-    def update(self):
+    def update(self, ticks=1):
+        """
+        Advances the canvas the ticks elapsed since its previous update.
+        """
         if hasattr(self, "canvas"):
-            self.canvas.update_figure(self.parentWidget().simDelay)
+            self.canvas.update_figure(ticks * self.parentWidget().simDelay,
+                                      self.isExposed())
+
+    def isExposed(self):
+        """
+        Returns False if the window is hidden, minimized or not exposed by the
+        window system, so its canvas doesn't need to be rendered. Only the
+        window systems that track the occlusion, like macOS or some Wayland
+        compositors, stop exposing the windows covered by other ones; X11
+        and Windows keep them exposed.
+        """
+        handle = self.windowHandle()
+        return (self.isVisible() and not self.isMinimized() and
+                (handle is None or handle.isExposed()))
+
+    def _catchUp(self):
+        if hasattr(self, "canvas") and self.canvas.stale:
+            self.canvas.redraw()
+
+    def showEvent(self, event):
+        super().showEvent(event)
+        #The expose events are delivered to the native window, not to the
+        #widget
+        handle = self.windowHandle()
+        if handle is not None and not getattr(self, "_exposeFilter", False):
+            handle.installEventFilter(self)
+            self._exposeFilter = True
+        self._catchUp()
+
+    def eventFilter(self, obj, event):
+        if (obj is self.windowHandle() and
+            event.type() == QtCore.QEvent.Expose and obj.isExposed()):
+            #Redrawn once the window has processed the event
+            QtCore.QTimer.singleShot(0, self._catchUp)
+        return super().eventFilter(obj, event)
+
+    def changeEvent(self, event):
+        super().changeEvent(event)
+        if (event.type() == QtCore.QEvent.WindowStateChange and
+            not self.isMinimized()):
+            self._catchUp()
 
     def initAnimation(self, start):
         if hasattr(self, "canvas"):
             self.canvas.initAnimation(start)
 
+    def setWorkerPool(self, pool):
+        if hasattr(self, "canvas"):
+            self.canvas.setWorkerPool(pool)
+
+    def seek(self, sec):
+        if hasattr(self, "canvas"):
+            self.canvas.seek(sec, self.isExposed())
+
+    def clearCache(self):
+        if hasattr(self, "canvas"):
+            self.canvas.clearCache()
+
+    def frame(self):
+        if hasattr(self, "canvas"):
+            return self.canvas.frame()
+        return None
+
     def selectedBands(self):
         return [x.accessibleName() for x in self.bandsCBs if x.isChecked()]
 
@@ -241,6 +409,10 @@ class PlotWindow(QtWidgets.QDialog):
         if self.engagementCB.isChecked():
             featuresFuncs.append("engagementLevel")
             featuresNames.append("Engagement")
+        #Plugins, always after the features of the wrapper
+        pluginsFuncs, pluginsNames = self._getPluginsFuncsAndNames(False)
+        featuresFuncs += pluginsFuncs
+        featuresNames += pluginsNames
 
         return featuresFuncs, featuresNames
     
@@ -267,6 +439,10 @@ class PlotWindow(QtWidgets.QDialog):
         if self.cccCB.isChecked():
             featuresFuncs.append("CCC")
             featuresNames.append("CCC")
+        #Plugins, always after the features of the wrapper
+        pluginsFuncs, pluginsNames = self._getPluginsFuncsAndNames(True)
+        featuresFuncs += pluginsFuncs
+        featuresNames += pluginsNames
         
         return featuresFuncs, featuresNames
 
@@ -284,11 +460,72 @@ class BaseCanvas():
         else:
             self. channelsNames = None
 
+        #True when the data has changed but the plots weren't rendered
+        self.stale = False
+
+        self.annotations = None
+        self.overlays    = []
+
+    def setAnnotations(self, annotations):
+        """
+        Sets the annotations that will be drawn over the plots.
+        """
+        self.annotations = annotations
+        if annotations is not None and len(annotations):
+            self.overlays = [AnnotationOverlay(plotter)
+                             for plotter in self.plotters]
+
+    def setWorkerPool(self, pool):
+        """
+        Sets the pool of processes that can be used to compute the data.
+        """
+        pass
+
+    def _drawAnnotations(self, start, end):
+        for overlay in self.overlays:
+            overlay.update(self.annotations, start, end)
+
     def initAnimation(self, start):
         self.sec = start
 
-    def update_figure(self, delay):
+    def update_figure(self, delay, render=True):
+        """
+        Advances the canvas. If render is False only the data is kept up to
+        date and the plots are left as they are until redraw is called.
+        """
         self.sec += delay
+        self.stale = not render
+
+    def seek(self, sec, render=True):
+        """
+        Moves the canvas to sec without going through the positions between
+        the current one and sec.
+        """
+        self.sec = sec
+        self.stale = not render
+        if render:
+            self.makePlot()
+
+    def clearCache(self):
+        """
+        Discards the values computed from the previous samples, for example
+        after changing the filters.
+        """
+        pass
+
+    def redraw(self):
+        self.makePlot()
+        self.stale = False
+
+    def frame(self):
+        """
+        Returns the names and the values computed in the last step, or None if
+        the canvas doesn't compute features.
+        """
+        return None
+
+    def makePlot(self):
+        pass
 
 
 class TimeSignalCanvas(BaseCanvas):
@@ -303,6 +540,7 @@ class TimeSignalCanvas(BaseCanvas):
         
         self.plotters=[self.layout.addPlot(row=i, col=0, title=name) 
                         for i, name in enumerate(self.channelsNames)]
+        self.curves = [plotter.plot() for plotter in self.plotters]
 
     
     def initAnimation(self, start):
@@ -314,11 +552,20 @@ class TimeSignalCanvas(BaseCanvas):
         
         self.makePlot()
     
-    def update_figure(self, delay):
-        super().update_figure(delay)
+    def seek(self, sec, render=True):
+        #Only the visible window is filled again
+        self.start = sec
+        self.end   = sec + self.wsSeconds
+        self.sStart = int(sec*self.sampleRate)
+        
+        super().seek(sec, render)
+    
+    def update_figure(self, delay, render=True):
+        super().update_figure(delay, render)
         self.end += delay
         
-        self.makePlot()
+        if render:
+            self.makePlot()
         
     def makePlot(self):
         sEnd = int(self.end*self.sampleRate)
@@ -326,17 +573,29 @@ class TimeSignalCanvas(BaseCanvas):
         ys = self.helper.data[self.channels, self.sStart:sEnd]
         x  = np.linspace(self.start, self.end, len(ys[0]))
         
-        for plotter, y in zip(self.plotters, ys):
+        for plotter, curve, y in zip(self.plotters, self.curves, ys):
             plotter.setRange(xRange=(self.end-self.wsSeconds,self.end))
-            plotter.plot(x,y, clear=True)
+            curve.setData(x,y)
+        
+        self._drawAnnotations(self.end-self.wsSeconds, self.end)
 
 
 class FeaturesCanvas(BaseCanvas):
+    #If True, the features can be computed in the worker pool or without the
+    #wrapper when all of them are in sharedFeatures
+    parallelizable = True
+    
     def _wrapperFeatureName(self, name):
         return "_"+name+"_%d" 
     
     def _initWrapper(self, funcsNames):
-        self.wrapper = wrap.Wrapper(self.helper, flat = True)
+        if self.direct or not funcsNames:
+            self.wrapper = None
+            self.funcsNames = [self._wrapperFeatureName(name)
+                               for name in funcsNames]
+            return
+        
+        self.wrapper = wrap.Wrapper(self.helper, flat = True, store = False)
         
         for func in funcsNames:
             self.wrapper.addFeature(func, self.channels)
@@ -353,49 +612,190 @@ class FeaturesCanvas(BaseCanvas):
     def __init__(self, funcsNames, featuresNames, *args):
         super().__init__(*args)
         
-        self._initWrapper(funcsNames)
-        self._createPlotters()
-        
+        #The plugins are computed apart, after the rest of features
+        self.pluginFeatures = [plugins.registry[func] for func in funcsNames
+                               if func in plugins.registry]
+        self.funcs = [func for func in funcsNames
+                      if func not in plugins.registry]
         self.featuresNames = featuresNames
+        self.pool = None
+        #If True the features are computed without the wrapper, all the
+        #channels at once
+        self.direct = (self.parallelizable and
+                       all(func in sharedFeatures for func in self.funcs))
+        
+        self._initWrapper(self.funcs)
+        self.funcsNames += [self._wrapperFeatureName(plugin.key)
+                            for plugin in self.pluginFeatures]
+        self._createPlotters()
         
-        self.time = []
-        
+        #Recent values at full resolution and older ones aggregated
+        self.history = FeatureHistory()
+        #Values of each window position computed, read again when seeking
+        self.cache = FeatureCache()
+        self.position = None
+        self.lastFeatures = None
+        self.frameNames = None
 
 
     def initAnimation(self, start):
         super().initAnimation(start)
-        self.wrapper.reset()
+        if self.wrapper is not None:
+            self.wrapper.reset()
+        self.history.clear()
         self.update_figure(0)
 
 
-    def update_figure(self, delay):
-        super().update_figure(delay)
-        self.time.append(self.sec)
+    def update_figure(self, delay, render=True):
+        super().update_figure(delay, render)
         
-        self.clear()
-        
-        self.makePlot()
-        
-    def makePlot(self):
-        self.wrapper.getFeatures()
-        data = self.wrapper.getStoredFeatures()
+        #The features are always computed to keep the history complete
+        self._storeFeatures()
         
+        if render:
+            self.makePlot()
+    
+    def seek(self, sec, render=True):
+        previous = self.position
+        self.sec = sec
+        
+        #The history before sec is kept. Going back, the values after sec
+        #stay in the cache and are read again when they are played; going
+        #forward, the cached values skipped over fill the gap
+        self.history.truncate(sec)
+        if previous is not None:
+            for position in self.cache.between(previous,
+                                               self.helper.windowPosition):
+                self.history.append(position / self.helper.sampleRate,
+                                    self.cache.get(position))
+        self._storeFeatures()
+        
+        super().seek(sec, render)
+    
+    def clearCache(self):
+        self.cache.clear()
+    
+    def setWorkerPool(self, pool):
+        if self.direct:
+            self.pool = pool
+    
+    def _computeFeatures(self):
+        features = {}
+        if self.wrapper is not None:
+            features.update(self.wrapper.getFeatures())
+        elif self.funcs:
+            features.update(self._computeSharedFeatures())
+        
+        if self.pluginFeatures:
+            features.update(self._computePlugins())
+        return features
+    
+    def _computeSharedFeatures(self):
+        if self.pool is None:
+            window = self.helper.eeg.getChannel()[self.channels]
+            values = [applyToChannels(func, window) for func in self.funcs]
+        else:
+            #Only the position of the window is sent to the workers, the
+            #same window the helper has
+            offset = self.helper.windowPosition
+            length = self.helper.eeg.windowSize
+            values = self.pool.map([(sharedFeatures[func], offset, length,
+                                     self.channels) for func in self.funcs])
+        
+        return {self.getDataName(funcName, i): value
+                for funcName, channelValues in zip(self.funcsNames, values)
+                for i, value in enumerate(channelValues)}
+    
+    def _pluginInputs(self):
+        """
+        Returns the window given to the plugins, as a batch of one window,
+        and the pairs of channels.
+        """
+        return self.helper.eeg.getChannel()[self.channels][None], ()
+    
+    def _computePlugins(self):
+        windows, pairs = self._pluginInputs()
+        values = plugins.computePlugins(self.pluginFeatures, windows,
+                                        self.helper.sampleRate, pairs)
+        funcsNames = self.funcsNames[len(self.funcsNames) -
+                                     len(self.pluginFeatures):]
+        return {self.getDataName(funcName, i): value
+                for funcName, pluginValues in zip(funcsNames, values)
+                for i, value in enumerate(pluginValues[0])}
+    
+    def _storeFeatures(self):
+        self.position = self.helper.windowPosition
+        self.lastFeatures = self.cache.get(self.position)
+        if self.lastFeatures is None:
+            self.lastFeatures = self._computeFeatures()
+            self.cache.put(self.position, self.lastFeatures)
+        self.history.append(self.sec, self.lastFeatures)
+    
+    def frame(self):
+        if self.lastFeatures is None:
+            return None
+        
+        if self.frameNames is None:
+            #The title of the plot tells the channels of each value
+            self.frameNames = [(featureName if not plotter.titleLabel.text
+                                else "%s %s" % (plotter.titleLabel.text,
+                                                featureName), dataName)
+                               for plotter, _, featureName, dataName
+                               in self._dataNames()]
+        
+        return ([name for name, _ in self.frameNames],
+                [self.lastFeatures[dataName] for _, dataName
+                 in self.frameNames])
+    
+    def _visibleRange(self):
+        """
+        Returns the range of time shown and the width in pixels of the plots.
+        """
+        viewBox = self.plotters[0].getViewBox()
+        pixels = int(viewBox.width()) or 1000
+        if viewBox.autoRangeEnabled()[0]:
+            return -np.inf, np.inf, pixels
+        start, end = viewBox.viewRange()[0]
+        return start, end, pixels
+    
+    def _dataNames(self):
+        """
+        Yields the plotter, the index and name of the feature and the name of
+        the data of each curve.
+        """
         for i, plotter in enumerate(self.plotters):
             for (j,featureName), funcName in zip(enumerate(self.featuresNames),
                                                            self.funcsNames):
-                #The color of the plotting of each feature
-                pen=pg.mkPen(pg.intColor(j))
-                
-                #Get the data asociated to one feature
-                dataName = self.getDataName(funcName, i)
-                d=data[dataName]
-                
-                #Get the mean value of the data
-                mean = np.mean(d)
-                legend = featureName+": %.3f"%mean
-                
-                #Plot the data
-                plotter.plot(self.time, d, pen = pen, name=legend)
+                yield plotter, j, featureName, self.getDataName(funcName, i)
+        
+    def makePlot(self):
+        self.clear()
+        time, means, mins, maxs, aggregated = self.history.query(
+                                                        *self._visibleRange())
+        
+        for plotter, j, featureName, dataName in self._dataNames():
+            #The color of the plotting of each feature
+            color = pg.intColor(j)
+            pen=pg.mkPen(color)
+            
+            #Get the data asociated to one feature
+            column = self.history.columns[dataName]
+            d=means[:, column]
+            
+            #Get the mean value of the data
+            mean = np.mean(d)
+            legend = featureName+": %.3f"%mean
+            
+            #Plot the data
+            plotter.plot(time, d, pen = pen, name=legend)
+            
+            #Aggregated data is shown with its range
+            if aggregated:
+                color.setAlpha(80)
+                plotter.plot(time, mins[:, column], pen = pg.mkPen(color))
+                plotter.plot(time, maxs[:, column], pen = pg.mkPen(color))
+        
+        self._drawAnnotations(time[0], time[-1])
     
     def getDataName(self, funcName,i):
         return funcName%i
@@ -403,7 +803,9 @@ class FeaturesCanvas(BaseCanvas):
     
     def clear(self):
         for plotter in self.plotters:
-            plotter.clear()
+            #Only the curves are removed, the annotations are reused
+            for item in plotter.listDataItems():
+                plotter.removeItem(item)
             
             # This is done due to a bug in pyqtgraph
             # In the next version will be fixed
@@ -413,29 +815,38 @@ class FeaturesCanvas(BaseCanvas):
                 plotter.legend.removeItem(label)     
 
 class BandValuesCanvas(FeaturesCanvas):
+    parallelizable = False
+    
     def __init__(self, *args):
         super().__init__(["getAverageBandValues"], defaultBandsNames, *args)
         
     def _wrapperFeatureName(self, name):
         return super()._wrapperFeatureName(name) + "_%s"
     
-    def makePlot(self):
-        self.wrapper.getFeatures()
-        data = self.wrapper.getStoredFeatures()
-        
+    def _initWrapper(self, funcsNames):
+        #The bands of all the channels are computed from a single FFT
+        self.wrapper = None
+        self.funcsNames = [self._wrapperFeatureName(name)
+                           for name in funcsNames]
+    
+    def _computeFeatures(self):
+        window = self.helper.eeg.getChannel()[self.channels]
+        values = spectra.averageBandValues(spectra.magnitudes(window),
+                                           window.shape[-1],
+                                           self.helper.sampleRate)
+        return {self.funcsNames[0] % (i, band): value
+                for i, channelValues in enumerate(values)
+                for band, value in zip(defaultBandsNames, channelValues)}
+    
+    def _dataNames(self):
         for i, plotter in enumerate(self.plotters):
             for j, featureName in enumerate(self.featuresNames):
-                pen=pg.mkPen(pg.intColor(j))
-                
                 dataName = self.funcsNames[0]%(i, featureName)
-                d = data[dataName]
-                
-                mean = np.mean(d)
-                legend = featureName+": %.3f"%mean
-                
-                plotter.plot(self.time, d, pen = pen, name=legend)
+                yield plotter, j, featureName, dataName
 
 class TwoChannelsCanvas(FeaturesCanvas):
+    parallelizable = False
+    
     def __init__(self, *args):
         super().__init__(*args)
         self.channels = list(combinations(self.channels, 2))
@@ -456,19 +867,41 @@ class TwoChannelsCanvas(FeaturesCanvas):
     
     def _wrapperFeatureName(self, name):
         return "_"+name+"_(%d, %d)"
+    
+    def _pluginInputs(self):
+        return self.helper.eeg.getChannel()[None], self.channels
         
     def getDataName(self, funcName,i):
         return funcName%self.channels[i]
 
 class ChannelessCanvas(FeaturesCanvas):
+    parallelizable = False
+    
     def _initWrapper(self, funcsNames):
-        self.wrapper = wrap.Wrapper(self.helper, flat = True)
+        if all(func in spectralFeatures for func in funcsNames):
+            #Computed from a single FFT of all the channels
+            self.wrapper = None
+            self.funcsNames = ["_"+name for name in funcsNames]
+            return
+        
+        self.wrapper = wrap.Wrapper(self.helper, flat = True, store = False)
         
         for func in funcsNames:
             self.wrapper.addFeature(func)
             
         self.funcsNames = ["_"+name for name in self.wrapper.featuresNames()]
     
+    def _computeFeatures(self):
+        if self.wrapper is not None:
+            return dict(self.wrapper.getFeatures())
+        
+        window = self.helper.eeg.getChannel()
+        bandValues = spectra.bandPower(spectra.magnitudes(window),
+                                       window.shape[-1],
+                                       self.helper.sampleRate)
+        return {funcName: spectralFeatures[func](bandValues)
+                for func, funcName in zip(self.funcs, self.funcsNames)}
+    
     def _createPlotters(self):
         self.plotters=[self.layout.addPlot()]
   
@@ -494,15 +927,37 @@ class FFTCanvas(BaseCanvas):
         super().initAnimation(start)
         self.update_figure(0)
     
-    def update_figure(self, delay):
-        super().update_figure(delay)
+    def update_figure(self, delay, render=True):
+        super().update_figure(delay, render)
         
-        ffts = self.helper.eeg.getMagnitudes(self.channels)
-        ffts = ffts[:,1:self.windowSize//2+1]
+        if render:
+            self.makePlot()
+    
+    def makePlot(self):
+        #All the channels are transformed in one call
+        window = self.helper.eeg.getChannel()[self.channels]
+        ffts = spectra.magnitudes(window)[:,1:self.windowSize//2+1]
         
         for plotter, fft in zip(self.plotters, ffts):
             plotter.plot(self.x,fft,clear=True)
         
+        wsSeconds = self.windowSize/self.sampleRate
+        self._drawAnnotations(self.sec, self.sec + wsSeconds)
+    
+    def setAnnotations(self, annotations):
+        #The x axis is the frequency, so the annotations are shown in titles
+        self.annotations = annotations
+    
+    def _drawAnnotations(self, start, end):
+        if self.annotations is None or len(self.annotations) == 0:
+            return
+        
+        events = self.annotations.query(start, end)
+        descriptions = ", ".join(self.annotations.descriptions[events])
+        for plotter, name in zip(self.plotters, self.channelsNames):
+            plotter.setTitle(name + (" [%s]" % descriptions if descriptions
+                                     else ""))
+        
 
         
         
\ No newline at end of file
@@ -0,0 +1,262 @@
+"""
+This module defines the interface of the feature plugins. A plugin is a
+function that computes a feature for a batch of windows and all their
+channels at once. It declares which input it needs:
+
+- "window": the samples, in the shape (nWindows, nChannels, nSamples).
+- "spectrum": the magnitudes of the FFT, in the shape (nWindows, nChannels,
+  nFrequencies).
+- "pairs": the samples of pairs of channels, in the shape (nWindows, nPairs,
+  2, nSamples).
+
+and returns the value for each window and channel, or pair, in the shape
+(nWindows, nChannels) or (nWindows, nPairs). The inputs shared by several
+plugins, like the spectrum, are computed only once for each batch.
+
+A plugin is registered with the feature decorator:
+
+    from veegs.plugins import feature
+
+    @feature("Spectral Peak", inputs="spectrum")
+    def spectralPeak(spectrum, batch):
+        return batch.frequencies[spectrum.argmax(axis=-1)]
+
+The plugins are discovered at startup from the modules installed with the
+"veegs.features" entry point and from the Python files of the plugins
+directory, which is ~/.veegs/plugins or the one in the environment variable
+VEEGS_PLUGINS. Every plugin is shown as a checkbox in the plot windows.
+"""
+
+import glob
+import importlib.metadata
+import importlib.util
+import os
+import sys
+
+import numpy as np
+
+from . import spectra
+
+entryPointGroup = "veegs.features"
+
+pluginsDir = os.environ.get("VEEGS_PLUGINS",
+                            os.path.join(os.path.expanduser("~"), ".veegs",
+                                         "plugins"))
+
+inputTypes = ("window", "spectrum", "pairs")
+
+#Plugins by their key, the name of their function
+registry = {}
+
+_discovered = False
+
+
+class FeaturePlugin():
+    """
+    This class stores a plugin: its function, the name shown in the plots and
+    the input it needs.
+    """
+    def __init__(self, function, name=None, inputs="window"):
+        if inputs not in inputTypes:
+            raise ValueError("The input of a plugin must be one of: " +
+                             ", ".join(inputTypes))
+        self.function = function
+        self.key = function.__name__
+        self.name = name or self.key
+        self.inputs = inputs
+
+    @property
+    def twoChannels(self):
+        return self.inputs == "pairs"
+
+    def compute(self, batch):
+        """
+        Returns the values of the feature for each window of the batch in the
+        shape (nWindows, nChannels) or (nWindows, nPairs).
+        """
+        values = np.asarray(self.function(batch.get(self.inputs), batch),
+                            dtype=float)
+        expected = (batch.nWindows, len(batch.pairs) if self.twoChannels
+                                    else batch.nChannels)
+        if values.shape != expected:
+            raise ValueError("The plugin %s returned the shape %s instead of "
+                             "%s." % (self.key, values.shape, expected))
+        return values
+
+
+def feature(name=None, inputs="window"):
+    """
+    Decorator that registers a function as a feature plugin.
+
+    Parameters
+    ----------
+    name: str, optional
+        The name shown in the plots. By default the name of the function.
+    inputs: str
+        The input of the function: "window", "spectrum" or "pairs".
+    """
+    def decorator(function):
+        plugin = FeaturePlugin(function, name, inputs)
+        if plugin.key in registry and registry[plugin.key].function is not\
+           function:
+            print("The plugin %s is already registered." % plugin.key,
+                  file=sys.stderr)
+        else:
+            registry[plugin.key] = plugin
+        return function
+    return decorator
+
+
+class WindowBatch():
+    """
+    This class holds the windows given to the plugins and computes the inputs
+    they ask for the first time they are needed.
+    """
+    def __init__(self, windows, sampleRate, pairs=()):
+        """
+        Parameters
+        ----------
+        windows: numpy.ndarray
+            The windows in the shape (nWindows, nChannels, nSamples).
+        sampleRate: numeric
+            The sample rate of the windows.
+        pairs: list of tuple(int, int)
+            The pairs of channels given to the two channels plugins.
+        """
+        #The single precision windows and their spectrum stay in single
+        #precision
+        windows = np.asarray(windows)
+        self.windows = windows.astype(np.result_type(windows, np.float32),
+                                      copy=False)
+        self.nWindows, self.nChannels, self.windowSize = self.windows.shape
+        self.sampleRate = sampleRate
+        self.pairs = list(pairs)
+        self._spectrum = None
+
+    @property
+    def spectrum(self):
+        if self._spectrum is None:
+            self._spectrum = spectra.magnitudes(self.windows, None)
+        return self._spectrum
+
+    @property
+    def frequencies(self):
+        """
+        The frequency of each bin of the spectrum.
+        """
+        return spectra.frequencies(self.windowSize, self.sampleRate)
+
+    def get(self, inputs):
+        if inputs == "window":
+            return self.windows
+        if inputs == "spectrum":
+            return self.spectrum
+        return self.windows[:, np.array(self.pairs, dtype=int).reshape(-1, 2)]
+
+
+def computePlugins(plugins, windows, sampleRate, pairs=()):
+    """
+    Computes several plugins over the same windows, sharing their inputs.
+
+    Parameters
+    ----------
+    plugins: list of FeaturePlugin
+        The plugins to compute.
+    windows: numpy.ndarray
+        The windows in the shape (nWindows, nChannels, nSamples).
+    sampleRate: numeric
+        The sample rate of the windows.
+    pairs: list of tuple(int, int)
+        The pairs of channels given to the two channels plugins.
+
+    Returns
+    -------
+    list of numpy.ndarray
+        The values of each plugin.
+    """
+    batch = WindowBatch(windows, sampleRate, pairs)
+    return [plugin.compute(batch) for plugin in plugins]
+
+
+def slidingWindows(data, windowSize, step):
+    """
+    Returns the windows of data, in the shape (nChannels, nSamples), as an
+    array in the shape (nWindows, nChannels, windowSize) without copying it.
+    """
+    windows = np.lib.stride_tricks.sliding_window_view(data, windowSize,
+                                                       axis=1)[:, ::step]
+    return windows.transpose(1, 0, 2)
+
+
+def _loadFile(path):
+    name = "veegs_plugin_" + os.path.splitext(os.path.basename(path))[0]
+    spec = importlib.util.spec_from_file_location(name, path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+
+
+def discover(directory=None):
+    """
+    Loads the plugins installed with the veegs.features entry point and the
+    Python files of directory, by default pluginsDir. The plugins that fail
+    to load are reported and skipped. It only loads them the first time it is
+    called.
+
+    Returns
+    -------
+    dict
+        The registered plugins by their key.
+    """
+    global _discovered
+    if _discovered:
+        return registry
+    _discovered = True
+
+    for entryPoint in importlib.metadata.entry_points(group=entryPointGroup):
+        try:
+            entryPoint.load()
+        except Exception as e:
+            print("The plugin %s couldn't be loaded: %s" % (entryPoint.name, e),
+                  file=sys.stderr)
+
+    directory = pluginsDir if directory is None else directory
+    for path in sorted(glob.glob(os.path.join(directory, "*.py"))):
+        try:
+            _loadFile(path)
+        except Exception as e:
+            print("The plugin %s couldn't be loaded: %s" % (path, e),
+                  file=sys.stderr)
+
+    return registry
+
+
+def oneChannelPlugins():
+    return [plugin for plugin in registry.values() if not plugin.twoChannels]
+
+
+def twoChannelsPlugins():
+    return [plugin for plugin in registry.values() if plugin.twoChannels]
+
+
+#Plugins included with VEEGS
+
+@feature("Line Length")
+def lineLength(windows, batch):
+    return np.abs(np.diff(windows, axis=-1)).mean(axis=-1)
+
+
+@feature("Spectral Entropy", inputs="spectrum")
+def spectralEntropy(spectrum, batch):
+    power = spectrum[..., 1:]**2
+    total = power.sum(axis=-1, keepdims=True)
+    p = power / np.where(total == 0, 1, total)
+    logs = np.log2(np.where(p > 0, p, 1))
+    return -(p * logs).sum(axis=-1) / np.log2(power.shape[-1])
+
+
+@feature("Correlation", inputs="pairs")
+def correlation(pairs, batch):
+    centered = pairs - pairs.mean(axis=-1, keepdims=True)
+    a, b = centered[..., 0, :], centered[..., 1, :]
+    norms = np.sqrt((a*a).sum(axis=-1) * (b*b).sum(axis=-1))
+    return (a*b).sum(axis=-1) / np.where(norms == 0, 1, norms)
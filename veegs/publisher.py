@@ -0,0 +1,366 @@
+"""
+This module defines a feed of the features computed while playing a
+recording, so other processes can receive them without computing them again.
+The features are published to any number of subscribers connected to a local
+TCP or Unix socket.
+
+Every message is a header with the length of the body and its type, followed
+by the body:
+
+- Schema: the stream number, its title and the names of its features. It is
+  sent when a subscriber connects and every time the features of a stream
+  change.
+- Frame: the stream number, the time in the recording, the wall clock time
+  and the value of each feature of the schema as a float64.
+
+All the numbers are little-endian.
+"""
+
+import argparse
+import collections
+import os
+import selectors
+import socket
+import struct
+import threading
+import time
+
+_header = struct.Struct("<IB")
+_schemaHeader = struct.Struct("<HH")
+_frameHeader  = struct.Struct("<Hdd")
+_string = struct.Struct("<H")
+
+SCHEMA = 1
+FRAME  = 2
+
+
+def parseAddress(address):
+    """
+    Returns the socket family and the address to bind or connect to.
+    "host:port" is a TCP address and anything else the path of a Unix socket.
+    """
+    host, _, port = address.rpartition(":")
+    if host and port.isdigit():
+        return socket.AF_INET, (host, int(port))
+    return socket.AF_UNIX, address
+
+
+def _encodeString(text):
+    data = text.encode()
+    return _string.pack(len(data)) + data
+
+
+def encodeSchema(stream, title, names):
+    body = (_schemaHeader.pack(stream, len(names)) + _encodeString(title) +
+            b"".join(_encodeString(name) for name in names))
+    return _header.pack(len(body), SCHEMA) + body
+
+
+def encodeFrame(stream, recordingTime, values):
+    body = (_frameHeader.pack(stream, recordingTime, time.time()) +
+            struct.pack("<%dd" % len(values), *values))
+    return _header.pack(len(body), FRAME) + body
+
+
+def decode(kind, body):
+    """
+    Decodes the body of a message.
+
+    Returns
+    -------
+    tuple
+        (stream, title, names) for a schema and (stream, recordingTime,
+        wallTime, values) for a frame.
+    """
+    if kind == SCHEMA:
+        stream, count = _schemaHeader.unpack_from(body)
+        offset = _schemaHeader.size
+        strings = []
+        for _ in range(count + 1):
+            length, = _string.unpack_from(body, offset)
+            offset += _string.size
+            strings.append(body[offset:offset + length].decode())
+            offset += length
+        return stream, strings[0], strings[1:]
+
+    stream, recordingTime, wallTime = _frameHeader.unpack_from(body)
+    count = (len(body) - _frameHeader.size) // 8
+    values = struct.unpack_from("<%dd" % count, body, _frameHeader.size)
+    return stream, recordingTime, wallTime, values
+
+
+class _Subscriber():
+    """
+    The messages waiting to be sent to a subscriber, in the order they were
+    published, so every frame is read with the schema it was published with.
+    At most queueSize frames wait: the oldest ones are dropped, but the
+    schemas are never dropped since the frames can't be read without them.
+
+    The messages are pushed by the thread that publishes them and sent by the
+    thread that serves the sockets, so the queue is guarded by a lock that is
+    released while sending.
+    """
+    def __init__(self, sock, queueSize):
+        self.sock = sock
+        self.queueSize = queueSize
+        self.lock = threading.Lock()
+        self.queue = collections.deque()
+        self.nFrames = 0
+        self.pending = b""
+        self.dropped = 0
+
+    def pushSchema(self, schema):
+        with self.lock:
+            self.queue.append((SCHEMA, schema))
+
+    def push(self, frame):
+        with self.lock:
+            if self.nFrames == self.queueSize:
+                #Only the schemas can be before the oldest frame
+                for i, (kind, _) in enumerate(self.queue):
+                    if kind == FRAME:
+                        del self.queue[i]
+                        break
+                self.nFrames -= 1
+                self.dropped += 1
+            self.queue.append((FRAME, frame))
+            self.nFrames += 1
+
+    def hasData(self):
+        with self.lock:
+            return bool(self.pending or self.queue)
+
+    def _pop(self):
+        """
+        Returns the next message, or None if the queue is empty.
+        """
+        with self.lock:
+            if not self.queue:
+                return None
+            kind, message = self.queue.popleft()
+            if kind == FRAME:
+                self.nFrames -= 1
+            return message
+
+    def send(self):
+        """
+        Sends as much as possible without blocking.
+        """
+        while True:
+            if not self.pending:
+                message = self._pop()
+                if message is None:
+                    return
+                self.pending = memoryview(message)
+            try:
+                sent = self.sock.send(self.pending)
+            except BlockingIOError:
+                return
+            self.pending = self.pending[sent:]
+
+
+class FeaturePublisher():
+    """
+    This class publishes frames of features to the subscribers connected to a
+    socket. The sockets are served by a separated thread, so publishing never
+    waits for a subscriber: if one is too slow its oldest frames are dropped.
+    """
+    def __init__(self, address, queueSize=256):
+        """
+        Parameters
+        ----------
+        address: str
+            "host:port" for a TCP socket or the path of a Unix socket.
+        queueSize: int
+            The number of frames that can wait for each subscriber.
+        """
+        self.queueSize = queueSize
+        family, target = parseAddress(address)
+
+        self.path = None
+        self.listener = socket.socket(family, socket.SOCK_STREAM)
+        if family == socket.AF_UNIX:
+            if os.path.exists(target):
+                os.unlink(target)
+            self.path = target
+        else:
+            self.listener.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR,
+                                     1)
+        self.listener.bind(target)
+        self.listener.listen()
+        self.listener.setblocking(False)
+        self.address = self.listener.getsockname()
+
+        self.subscribers = []
+        self.schemas = {}
+        self.lock = threading.Lock()
+
+        #Written to wake the thread up when there are new frames
+        self.wakeReader, self.wakeWriter = socket.socketpair()
+        self.wakeReader.setblocking(False)
+        self.wakeWriter.setblocking(False)
+
+        self.selector = selectors.DefaultSelector()
+        self.selector.register(self.listener,   selectors.EVENT_READ)
+        self.selector.register(self.wakeReader, selectors.EVENT_READ)
+
+        self.running = True
+        self.thread = threading.Thread(target=self._serve, daemon=True)
+        self.thread.start()
+
+    def publish(self, stream, title, recordingTime, names, values):
+        """
+        Sends the values of the features of a stream to every subscriber.
+
+        Parameters
+        ----------
+        stream: int
+            The number of the stream, for example one for each plot window.
+        title: str
+            The title of the stream.
+        recordingTime: float
+            The time in the recording of the values, in seconds.
+        names: list of str
+            The names of the features.
+        values: list of float
+            The values of the features.
+        """
+        names = tuple(names)
+        frame = encodeFrame(stream, recordingTime, values)
+        with self.lock:
+            if self.schemas.get(stream, (None,))[0] != (title, names):
+                schema = encodeSchema(stream, title, names)
+                self.schemas[stream] = ((title, names), schema)
+                for subscriber in self.subscribers:
+                    subscriber.pushSchema(schema)
+            for subscriber in self.subscribers:
+                subscriber.push(frame)
+        self._wake()
+
+    def _wake(self):
+        try:
+            self.wakeWriter.send(b"\0")
+        except BlockingIOError:
+            #The thread is going to wake up anyway
+            pass
+
+    def _serve(self):
+        while self.running:
+            for key, events in self.selector.select():
+                if key.fileobj is self.listener:
+                    self._accept()
+                elif key.fileobj is self.wakeReader:
+                    try:
+                        while self.wakeReader.recv(4096):
+                            pass
+                    except BlockingIOError:
+                        pass
+                else:
+                    self._handle(key.data, events)
+
+            #Only the subscribers with data are waited to be writable
+            with self.lock:
+                for subscriber in self.subscribers:
+                    events = selectors.EVENT_READ
+                    if subscriber.hasData():
+                        events |= selectors.EVENT_WRITE
+                    self.selector.modify(subscriber.sock, events, subscriber)
+
+    def _accept(self):
+        try:
+            sock, _ = self.listener.accept()
+        except BlockingIOError:
+            return
+        sock.setblocking(False)
+        subscriber = _Subscriber(sock, self.queueSize)
+        with self.lock:
+            for _, schema in self.schemas.values():
+                subscriber.pushSchema(schema)
+            self.subscribers.append(subscriber)
+        self.selector.register(sock, selectors.EVENT_READ, subscriber)
+
+    def _handle(self, subscriber, events):
+        try:
+            #The subscribers don't send anything, so reading is only useful
+            #to know when they disconnect
+            if events & selectors.EVENT_READ and not subscriber.sock.recv(4096):
+                raise ConnectionError()
+            if events & selectors.EVENT_WRITE:
+                subscriber.send()
+        except (BlockingIOError, InterruptedError):
+            pass
+        except OSError:
+            self._remove(subscriber)
+
+    def _remove(self, subscriber):
+        with self.lock:
+            self.subscribers.remove(subscriber)
+        self.selector.unregister(subscriber.sock)
+        subscriber.sock.close()
+
+    def close(self):
+        self.running = False
+        self._wake()
+        self.thread.join()
+
+        for subscriber in list(self.subscribers):
+            self._remove(subscriber)
+        self.selector.close()
+        self.listener.close()
+        self.wakeReader.close()
+        self.wakeWriter.close()
+        if self.path is not None and os.path.exists(self.path):
+            os.unlink(self.path)
+
+
+def _receive(sock, size):
+    data = bytearray()
+    while len(data) < size:
+        chunk = sock.recv(size - len(data))
+        if not chunk:
+            raise EOFError()
+        data += chunk
+    return bytes(data)
+
+
+def subscribe(address):
+    """
+    Connects to a publisher and yields its frames as they arrive.
+
+    Yields
+    ------
+    tuple(int, str, float, float, dict)
+        The stream, its title, the time in the recording, the wall clock time
+        when it was published and the values of the features by name.
+    """
+    family, target = parseAddress(address)
+    with socket.socket(family, socket.SOCK_STREAM) as sock:
+        sock.connect(target)
+        schemas = {}
+        try:
+            while True:
+                length, kind = _header.unpack(_receive(sock, _header.size))
+                message = decode(kind, _receive(sock, length))
+                if kind == SCHEMA:
+                    schemas[message[0]] = message[1:]
+                else:
+                    stream, recordingTime, wallTime, values = message
+                    title, names = schemas[stream]
+                    yield (stream, title, recordingTime, wallTime,
+                           dict(zip(names, values)))
+        except EOFError:
+            return
+
+
+def main():
+    parser = argparse.ArgumentParser(description = "Prints the features " +
+                                     "published by VEEGS.")
+    parser.add_argument("address", help = "host:port or the path of a Unix " +
+                        "socket.")
+    args = parser.parse_args()
+
+    for stream, title, recordingTime, wallTime, values in subscribe(
+                                                                 args.address):
+        print("%d\t%s\t%.3f\t" % (stream, title, recordingTime) +
+              "\t".join("%s=%g" % item for item in values.items()),
+              flush=True)
@@ -0,0 +1,125 @@
+"""
+This module decides which plot windows are updated in each tick of the
+playback loop, so every window can refresh at its own rate.
+"""
+
+import math
+
+import numpy as np
+
+
+class UpdateScheduler():
+    """
+    This class schedules the updates of several windows, each one every
+    interval ticks. The windows with an interval greater than one are spread
+    among the ticks according to the time they take to update, so the
+    expensive ones don't coincide in the same tick and the duration of the
+    ticks stays even.
+    """
+    #Ticks between the rebalances done with the measured costs
+    rebalanceTicks = 64
+    #Weight of the last measure in the average cost of a window
+    smoothing = 0.2
+    #Cost of the windows that haven't been measured yet
+    defaultCost = 1e-3
+    #Maximum number of ticks considered when balancing the load
+    maxHorizon = 4096
+
+    def __init__(self):
+        self.tick = 0
+        self.intervals = {}
+        self.phases = {}
+        self.costs = {}
+        self.last = {}
+
+    def __contains__(self, key):
+        return key in self.intervals
+
+    def add(self, key, interval=1):
+        self.intervals[key] = max(1, int(interval))
+        self.phases[key] = 0
+        self.last[key] = self.tick
+        self._rebalance()
+
+    def remove(self, key):
+        for attribute in (self.intervals, self.phases, self.costs, self.last):
+            attribute.pop(key, None)
+        self._rebalance()
+
+    def setInterval(self, key, interval):
+        interval = max(1, int(interval))
+        if self.intervals.get(key) != interval:
+            self.intervals[key] = interval
+            self._rebalance()
+
+    def restart(self):
+        """
+        Marks all the windows as updated in the current tick, for example after
+        they have been moved to a new position.
+        """
+        for key in self.last:
+            self.last[key] = self.tick
+
+    def due(self):
+        """
+        Advances to the next tick.
+
+        Returns
+        -------
+        list of tuple
+            The windows that must be updated in the tick and the ticks elapsed
+            since their previous update.
+        """
+        self.tick += 1
+        if self.tick % self.rebalanceTicks == 0:
+            self._rebalance()
+
+        due = []
+        for key, interval in self.intervals.items():
+            if (self.tick - self.phases[key]) % interval == 0:
+                due.append((key, self.tick - self.last[key]))
+                self.last[key] = self.tick
+        return due
+
+    def record(self, key, seconds):
+        """
+        Records the time a window took to update.
+        """
+        if key not in self.intervals:
+            return
+        if key in self.costs:
+            seconds = (1 - self.smoothing)*self.costs[key] + \
+                      self.smoothing*seconds
+        self.costs[key] = seconds
+
+    def _rebalance(self):
+        """
+        Assigns a phase to each window, from the most expensive to the
+        cheapest, choosing the one whose ticks have less load. The current
+        phase is kept if it is as good as the best one.
+        """
+        if not self.intervals:
+            return
+        #The load repeats every lcm of the intervals. It is computed with
+        #Python integers, that don't overflow, and stops at maxHorizon
+        horizon = 1
+        for interval in self.intervals.values():
+            horizon = horizon * interval // math.gcd(horizon, interval)
+            if horizon >= self.maxHorizon:
+                horizon = self.maxHorizon
+                break
+        load = np.zeros(horizon)
+
+        def cost(key):
+            return self.costs.get(key, self.defaultCost)
+
+        for key in sorted(self.intervals, key=cost, reverse=True):
+            interval = self.intervals[key]
+            #The phases beyond the horizon aren't in the load
+            loads = [load[phase::interval].max(initial=0)
+                     for phase in range(min(interval, horizon))]
+            phase = self.phases[key] % interval
+            if phase >= len(loads) or loads[phase] > min(loads):
+                phase = int(np.argmin(loads))
+            self.phases[key] = phase
+            load[phase::interval] += cost(key)
@@ -0,0 +1,166 @@
+"""
+This module defines a data plane based on shared memory between the GUI and a
+pool of worker processes. The recording is copied once to a shared memory
+block that the workers attach to by name, so a job only carries the position
+of the data it needs, and the results are written back to a shared ring.
+"""
+
+import multiprocessing
+
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory, resource_tracker
+
+import numpy as np
+
+
+def _attachMemory(name):
+    """
+    Attaches to an existing block. Only its owner must unlink it, but the
+    resource tracker of a process that isn't forked from the owner would do it
+    when that process ends.
+    """
+    try:
+        return shared_memory.SharedMemory(name=name, track=False)
+    except TypeError:
+        shm = shared_memory.SharedMemory(name=name)
+        if multiprocessing.get_start_method() != "fork":
+            resource_tracker.unregister(shm._name, "shared_memory")
+        return shm
+
+
+class SharedArray():
+    """
+    This is a numpy array stored in a shared memory block. It is created by
+    one process and attached by the others through its descriptor.
+    """
+    def __init__(self, shape, dtype, name=None):
+        self.owner = name is None
+        size = max(1, int(np.prod(shape)) * np.dtype(dtype).itemsize)
+
+        if self.owner:
+            self.shm = shared_memory.SharedMemory(create=True, size=size)
+        else:
+            self.shm = _attachMemory(name)
+
+        self.array = np.ndarray(shape, dtype, buffer=self.shm.buf)
+
+    @classmethod
+    def fromArray(cls, data):
+        shared = cls(data.shape, data.dtype)
+        shared.array[:] = data
+        return shared
+
+    @classmethod
+    def attach(cls, descriptor):
+        name, shape, dtype = descriptor
+        return cls(shape, dtype, name)
+
+    def descriptor(self):
+        return self.shm.name, self.array.shape, self.array.dtype.str
+
+    def close(self):
+        del self.array
+        self.shm.close()
+        if self.owner:
+            self.shm.unlink()
+
+
+#Arrays attached by each worker process
+_recording = None
+_results   = None
+
+def _attach(recordingDescriptor, resultsDescriptor):
+    global _recording, _results
+    _recording = SharedArray.attach(recordingDescriptor)
+    _results   = SharedArray.attach(resultsDescriptor)
+
+def _runJob(function, slot, offset, length, channels):
+    """
+    Applies function to each channel of the window and writes the values in
+    a slot of the result ring.
+    """
+    for i, channel in enumerate(channels):
+        #A basic slice is a view, so the samples aren't copied
+        signal = _recording.array[channel, offset:offset + length]
+        _results.array[slot, i] = function(signal)
+    return slot
+
+
+class SharedWorkerPool():
+    """
+    This class is a pool of processes that compute one channel functions over
+    windows of a recording in shared memory. The channels of each job are
+    split in ranges so that all the workers are used even if there are fewer
+    jobs than workers.
+    """
+    def __init__(self, data, workers, slots=64):
+        """
+        Parameters
+        ----------
+        data: 2D numpy.ndarray
+            The recording in the shape (nChannels, nSamples).
+        workers: int
+            The number of processes.
+        slots: int
+            The number of jobs that can be waiting to be read at once.
+        """
+        self.recording = SharedArray.fromArray(data)
+        self.results   = SharedArray((slots, len(data)), np.float64)
+        self.slots   = slots
+        self.workers = workers
+        self.nextJob = 0
+
+        self.pool = ProcessPoolExecutor(workers, initializer=_attach,
+                                        initargs=(self.recording.descriptor(),
+                                                  self.results.descriptor()))
+
+    def map(self, jobs):
+        """
+        Runs the jobs in parallel and returns their results.
+
+        Parameters
+        ----------
+        jobs: list of tuple(function, offset, length, channels)
+            The function must be defined at module level, since only its name
+            is sent to the workers.
+
+        Returns
+        -------
+        list of numpy.ndarray
+            The value of the function for each channel of each job.
+        """
+        if len(jobs) > self.slots:
+            raise ValueError("There are more jobs than slots.")
+
+        futures = []
+        for function, offset, length, channels in jobs:
+            futures.append([])
+            for part in self._split(channels, len(jobs)):
+                slot = self.nextJob % self.slots
+                self.nextJob += 1
+                futures[-1].append((self.pool.submit(_runJob, function, slot,
+                                                     offset, length, part),
+                                    len(part)))
+
+        #The ranges of each job are joined in the order of the channels
+        return [np.concatenate([np.empty(0)] +
+                               [self.results.array[future.result(), :n]
+                                for future, n in parts])
+                for parts in futures]
+
+    def _split(self, channels, nJobs):
+        """
+        Returns the consecutive ranges in which the channels of a job are
+        computed, enough to give a range to every worker but not more than
+        the slots available to each job.
+        """
+        channels = list(channels)
+        nParts = min(-(-self.workers // nJobs), self.slots // nJobs,
+                     len(channels))
+        return [part.tolist() for part in
+                np.array_split(channels, max(nParts, 1)) if len(part)]
+
+    def close(self):
+        self.pool.shutdown()
+        self.recording.close()
+        self.results.close()
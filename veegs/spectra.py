@@ -0,0 +1,168 @@
+"""
+This module computes the spectra used by the plots: the magnitudes of the FFT,
+the average band values, the power of each band and the engagement level, the
+last two with the same definitions as EEG.bandPower and EEG.engagementLevel of
+eeglib. The FFT is done by a backend that can be selected:
+
+- "numpy": numpy.fft, in a single thread.
+- "scipy": scipy.fft, that can split the channels among several threads.
+
+The window functions and the weights of each band are cached for each window
+size and sample rate, and all the channels of a window are transformed in a
+single call.
+"""
+
+import functools
+
+import numpy as np
+import scipy.fft
+from scipy import signal
+
+from eeglib.eeg import defaultBands
+
+
+class NumpyBackend():
+    name = "numpy"
+
+    def rfft(self, data):
+        return np.fft.rfft(data, axis=-1)
+
+
+class ScipyBackend():
+    name = "scipy"
+
+    def __init__(self, workers=None):
+        """
+        Parameters
+        ----------
+        workers: int, optional
+            The number of threads. By default one, since the features can
+            already be computed by a pool of processes.
+        """
+        self.workers = workers or 1
+
+    def rfft(self, data):
+        return scipy.fft.rfft(data, axis=-1, workers=self.workers)
+
+
+backends = {"numpy": NumpyBackend,
+            "scipy": ScipyBackend}
+
+_backend = ScipyBackend()
+
+
+def setBackend(name, workers=None):
+    """
+    Sets the backend used by all the plots.
+
+    Parameters
+    ----------
+    name: str
+        "numpy" or "scipy".
+    workers: int, optional
+        The number of threads of the scipy backend. By default one.
+    """
+    global _backend
+    if name not in backends:
+        raise ValueError("%s is not a valid FFT backend. Available: %s" %
+                         (name, ", ".join(backends)))
+    _backend = ScipyBackend(workers) if name == "scipy" else backends[name]()
+
+
+def getBackend():
+    return _backend
+
+
+@functools.lru_cache(maxsize=32)
+def windowFunction(windowSize, name="hann", dtype=np.float64):
+    """
+    Returns the window function of windowSize samples in the given dtype. The
+    array is shared, so it is read only.
+    """
+    window = signal.get_window(name, windowSize).astype(dtype)
+    window.setflags(write=False)
+    return window
+
+
+@functools.lru_cache(maxsize=32)
+def frequencies(windowSize, sampleRate):
+    """
+    Returns the frequency of each bin of the spectrum.
+    """
+    bins = np.fft.rfftfreq(windowSize, 1/sampleRate)
+    bins.setflags(write=False)
+    return bins
+
+
+@functools.lru_cache(maxsize=32)
+def _bandMatrix(windowSize, sampleRate, bands, integrate):
+    """
+    Returns a matrix in the shape (nBins, nBands) with the weights of the bins
+    of each band, so the values of all the bands of all the channels are
+    computed with a single product. If integrate is True the weights are the
+    ones of the trapezoidal rule, otherwise they average the bins.
+    """
+    nBins = windowSize//2 + 1
+    resolution = sampleRate / windowSize
+    matrix = np.zeros((nBins, len(bands)))
+    for j, (_, (low, high)) in enumerate(bands):
+        #The same bounds that eeglib uses. A band of a single bin has no area
+        start = min(int(low  * windowSize / sampleRate), nBins)
+        stop  = min(int(high * windowSize / sampleRate), nBins)
+        if not integrate and stop > start:
+            matrix[start:stop, j] = 1 / (stop - start)
+        elif integrate and stop - start > 1:
+            matrix[start:stop, j] = resolution
+            matrix[[start, stop - 1], j] = resolution / 2
+    matrix.setflags(write=False)
+    return matrix
+
+
+def magnitudes(window, function="hann"):
+    """
+    Returns the magnitudes of the positive frequencies of the FFT of each
+    channel, in the shape (nChannels, windowSize//2 + 1).
+
+    Parameters
+    ----------
+    window: numpy.ndarray
+        The window in the shape (nChannels, windowSize).
+    function: str or None
+        The window function applied before the FFT.
+    """
+    #The single precision windows are transformed in single precision
+    window = np.asarray(window)
+    window = window.astype(np.result_type(window, np.float32), copy=False)
+    if function is not None:
+        window = window * windowFunction(window.shape[-1], function,
+                                         window.dtype)
+    return np.abs(_backend.rfft(window))
+
+
+def averageBandValues(spectrum, windowSize, sampleRate, bands=defaultBands):
+    """
+    Returns the mean of the magnitudes of each band of each channel, in the
+    shape (nChannels, nBands), in the order of bands.
+    """
+    matrix = _bandMatrix(windowSize, sampleRate, tuple(bands.items()), False)
+    return spectrum @ matrix.astype(spectrum.dtype, copy=False)
+
+
+def bandPower(spectrum, windowSize, sampleRate, bands=defaultBands):
+    """
+    Returns the power of each band of each channel, in the shape (nChannels,
+    nBands), in the order of bands. It is the integral of the magnitudes of
+    the band with the trapezoidal rule, as EEG.bandPower of eeglib computes
+    it.
+    """
+    matrix = _bandMatrix(windowSize, sampleRate, tuple(bands.items()), True)
+    return spectrum @ matrix.astype(spectrum.dtype, copy=False)
+
+
+def engagementLevel(bandValues, bands=defaultBands):
+    """
+    Returns beta/(alpha + theta), where each band is averaged over all the
+    channels, from the values returned by bandPower.
+    """
+    means = dict(zip(bands, np.mean(bandValues, axis=0)))
+    return means["beta"] / (means["alpha"] + means["theta"])